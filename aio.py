@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from database import db
+
+
+class DatabaseExecutor:
+    """
+    Exécute les appels bloquants des modèles hors de la boucle asyncio :
+    - les lectures dans un pool de `readers` threads (au plus une connexion chacun),
+      dimensionné à la demande d'après la taille courante du pool de la base ;
+    - les écritures dans l'écrivain unique de la base (Database.submit), dans
+      l'ordre de soumission et regroupées en commits communs.
+    Les coroutines en attente ne coûtent pas de thread : des milliers de
+    lectures concurrentes se partagent les `readers` threads.
+    """
+
+    def __init__(self, readers: Optional[int] = None):
+        self._readers = readers
+        self._reader_pool: Optional[ThreadPoolExecutor] = None
+        self._reader_pool_size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def readers(self) -> int:
+        """Nombre de threads lecteurs : celui demandé, sinon la taille actuelle du pool de lecture"""
+        if self._readers:
+            return self._readers
+        # L'écrivain a sa propre connexion : les lecteurs peuvent occuper tout le pool
+        return (db.read_pool or db.pool).size
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Taille relue à chaque appel pour suivre db.configure(pool_size=...)
+        readers = self.readers
+        with self._lock:
+            if self._reader_pool is None or self._reader_pool_size != readers:
+                if self._reader_pool is not None:
+                    # Les lectures déjà soumises se terminent dans l'ancien pool
+                    self._reader_pool.shutdown(wait=False)
+                self._reader_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-read')
+                self._reader_pool_size = readers
+            return self._reader_pool
+
+    async def read(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Exécute un appel en lecture dans le pool de lecteurs"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), functools.partial(func, *args, **kwargs))
+
+    async def write(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Exécute un appel en écriture dans l'écrivain unique"""
+        return await asyncio.wrap_future(db.submit(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._reader_pool is not None:
+                self._reader_pool.shutdown(wait=wait)
+            self._reader_pool = None
+
+
+# Exécuteur partagé par les méthodes a* des modèles
+executor = DatabaseExecutor()
+
+async def read(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Exécute une lecture bloquante avec l'exécuteur partagé"""
+    return await executor.read(func, *args, **kwargs)
+
+async def write(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Exécute une écriture bloquante avec l'exécuteur partagé"""
+    return await executor.write(func, *args, **kwargs)
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class LoginGuard:
+    """
+    Protège le chemin de connexion :
+    - cache LRU/TTL des vérifications réussies, indexé par une empreinte à clé
+      de (email, mot de passe, empreinte stockée) : une connexion répétée évite
+      le hachage coûteux, et un changement de mot de passe invalide l'entrée ;
+    - compteurs d'échecs par compte, en mémoire avec éviction : au-delà de
+      `max_failures` échecs dans `window` secondes, les tentatives sont
+      rejetées sans requête ni hachage.
+    """
+
+    def __init__(self, cache_size: int = 10_000, cache_ttl: float = 300.0,
+                 max_failures: int = 5, window: float = 300.0, tracked_accounts: int = 100_000):
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.max_failures = max_failures
+        self.window = window
+        self.tracked_accounts = tracked_accounts
+        self._key = os.urandom(32)
+        self._verified: 'OrderedDict[bytes, float]' = OrderedDict()
+        self._failures: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, mail: str, mdp: str, mdp_hash: str) -> bytes:
+        data = '\0'.join((mail, mdp, mdp_hash)).encode()
+        return hashlib.blake2b(data, key=self._key, digest_size=32).digest()
+
+    def is_locked(self, mail: str) -> bool:
+        """Indique si le compte a dépassé le nombre d'échecs autorisés"""
+        with self._lock:
+            entry = self._failures.get(mail)
+            if entry is None:
+                return False
+            count, first = entry
+            if time.monotonic() - first > self.window:
+                del self._failures[mail]
+                return False
+            return count >= self.max_failures
+
+    def record_failure(self, mail: str) -> None:
+        """Comptabilise un échec de connexion"""
+        now = time.monotonic()
+        with self._lock:
+            count, first = self._failures.pop(mail, (0, now))
+            if now - first > self.window:
+                count, first = 0, now
+            self._failures[mail] = (count + 1, first)
+            while len(self._failures) > self.tracked_accounts:
+                self._failures.popitem(last=False)
+
+    def record_success(self, mail: str) -> None:
+        """Remet à zéro le compteur d'échecs du compte"""
+        with self._lock:
+            self._failures.pop(mail, None)
+
+    def is_verified(self, mail: str, mdp: str, mdp_hash: str) -> bool:
+        """Indique si cette combinaison a été vérifiée récemment"""
+        digest = self._digest(mail, mdp, mdp_hash)
+        with self._lock:
+            expires = self._verified.get(digest)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._verified[digest]
+                return False
+            self._verified.move_to_end(digest)
+            return True
+
+    def remember(self, mail: str, mdp: str, mdp_hash: str) -> None:
+        """Mémorise une vérification réussie pour `cache_ttl` secondes"""
+        digest = self._digest(mail, mdp, mdp_hash)
+        with self._lock:
+            self._verified[digest] = time.monotonic() + self.cache_ttl
+            self._verified.move_to_end(digest)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache et les compteurs"""
+        with self._lock:
+            self._verified.clear()
+            self._failures.clear()
+
+
+# Garde partagée par User.get_by_credentials
+login_guard = LoginGuard()
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from database import db
+
+
+class ModelCache:
+    """
+    Cache LRU partagé par le processus, borné en taille et en durée de vie.
+    Il conserve les lignes brutes (tuples) et non les objets : chaque appelant
+    reçoit une instance neuve qu'il peut modifier sans effet de bord.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._rows: 'OrderedDict[Hashable, Tuple[float, tuple]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.identity_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def configure(self, max_size: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        """Ajuste la taille et la durée de vie (max_size=0 désactive le cache)"""
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: Hashable) -> Optional[tuple]:
+        """Retourne la ligne en cache, ou None si absente ou expirée"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._rows.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._rows[key]
+                self.misses += 1
+                return None
+            self._rows.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, row: tuple) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._rows[key] = (time.monotonic() + self.ttl, row)
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._rows.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de succès/échecs pour dimensionner le cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._rows),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'identity_hits': self.identity_hits,
+            }
+
+
+# Cache partagé par les modèles
+model_cache = ModelCache()
+
+_local = threading.local()
+
+@contextmanager
+def session() -> Iterator[Dict[Hashable, Any]]:
+    """
+    Ouvre une carte d'identité pour le thread courant : dans le bloc, une même
+    ligne est toujours représentée par le même objet et n'est lue qu'une fois.
+    """
+    identity_map = getattr(_local, 'identity_map', None)
+    if identity_map is not None:
+        yield identity_map
+        return
+    _local.identity_map = {}
+    try:
+        yield _local.identity_map
+    finally:
+        _local.identity_map = None
+
+
+def lookup(key: Hashable, loader: Callable[[], Optional[tuple]], factory: Callable[..., Any],
+           identity: Optional[Callable[[tuple], Hashable]] = None) -> Any:
+    """
+    Lecture à travers la carte d'identité puis le cache partagé, et enfin `loader`.
+    `identity` donne la clé canonique d'une ligne (par ex. l'ID pour une recherche par email).
+    """
+    identity_map = getattr(_local, 'identity_map', None)
+    if identity_map is not None and key in identity_map:
+        model_cache.identity_hits += 1
+        return identity_map[key]
+
+    row = model_cache.get(key)
+    if row is None:
+        row = loader()
+        if row is None:
+            return None
+        model_cache.set(key, tuple(row))
+
+    if identity_map is None:
+        return factory(*row)
+    canonical = identity(row) if identity else key
+    obj = identity_map.get(canonical)
+    if obj is None:
+        obj = identity_map[canonical] = factory(*row)
+    identity_map[key] = obj
+    return obj
+
+
+def invalidate(*keys: Hashable) -> None:
+    """
+    Invalide des entrées dans le cache partagé et la carte d'identité courante.
+    Dans une transaction, le cache partagé est invalidé à nouveau après le
+    commit : un lecteur qui a relu l'ancienne ligne entre-temps ne l'y laisse pas.
+    """
+    model_cache.invalidate(*keys)
+    if db.in_transaction():
+        db.after_commit(model_cache.invalidate, *keys)
+    identity_map = getattr(_local, 'identity_map', None)
+    if identity_map is not None:
+        for key in keys:
+            identity_map.pop(key, None)
@@ -1,92 +1,841 @@
+import atexit
+import queue
 import sqlite3
-from typing import Optional, List, Tuple, Any, Type, TypeVar, Dict
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import islice
+from typing import Optional, List, Tuple, Any, Type, TypeVar, Dict, Iterator, Iterable, Callable
 import os
+from urllib.parse import quote
+from queries import registry
 
 T = TypeVar('T', bound='Model')
 
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Découpe un itérable en listes d'au plus `size` éléments"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Définition des droits d'accès à partir des tables de liaison
+EFFECTIVE_ACCESS_SOURCE = '''
+    SELECT user_id, password_id, 'partage', '' FROM user_pwd
+    UNION
+    SELECT created_by, id, 'createur', '' FROM password
+    UNION
+    SELECT m.user_id, gp.password_id, 'groupe', gp.groupe_id
+    FROM membre m JOIN grp_pwd gp ON gp.groupe_id = m.groupe_id
+'''
+
+# Triggers qui tiennent effective_access à jour quand la table est activée
+# (voir Database.materialize_access) : (nom, définition)
+EFFECTIVE_ACCESS_TRIGGERS: List[Tuple[str, str]] = [
+    ('trg_user_pwd_insert', '''CREATE TRIGGER IF NOT EXISTS trg_user_pwd_insert AFTER INSERT ON user_pwd BEGIN
+        INSERT OR IGNORE INTO effective_access VALUES (NEW.user_id, NEW.password_id, 'partage', '');
+    END'''),
+    ('trg_user_pwd_delete', '''CREATE TRIGGER IF NOT EXISTS trg_user_pwd_delete AFTER DELETE ON user_pwd BEGIN
+        DELETE FROM effective_access
+        WHERE user_id = OLD.user_id AND password_id = OLD.password_id AND via = 'partage';
+    END'''),
+    ('trg_password_insert', '''CREATE TRIGGER IF NOT EXISTS trg_password_insert AFTER INSERT ON password BEGIN
+        INSERT OR IGNORE INTO effective_access VALUES (NEW.created_by, NEW.id, 'createur', '');
+    END'''),
+    ('trg_password_delete', '''CREATE TRIGGER IF NOT EXISTS trg_password_delete AFTER DELETE ON password BEGIN
+        DELETE FROM effective_access WHERE password_id = OLD.id;
+    END'''),
+    ('trg_grp_pwd_insert', '''CREATE TRIGGER IF NOT EXISTS trg_grp_pwd_insert AFTER INSERT ON grp_pwd BEGIN
+        INSERT OR IGNORE INTO effective_access
+        SELECT m.user_id, NEW.password_id, 'groupe', NEW.groupe_id FROM membre m WHERE m.groupe_id = NEW.groupe_id;
+    END'''),
+    ('trg_grp_pwd_delete', '''CREATE TRIGGER IF NOT EXISTS trg_grp_pwd_delete AFTER DELETE ON grp_pwd BEGIN
+        DELETE FROM effective_access
+        WHERE password_id = OLD.password_id AND via = 'groupe' AND groupe_id = OLD.groupe_id;
+    END'''),
+    ('trg_membre_insert', '''CREATE TRIGGER IF NOT EXISTS trg_membre_insert AFTER INSERT ON membre BEGIN
+        INSERT OR IGNORE INTO effective_access
+        SELECT NEW.user_id, gp.password_id, 'groupe', NEW.groupe_id FROM grp_pwd gp WHERE gp.groupe_id = NEW.groupe_id;
+    END'''),
+    ('trg_membre_delete', '''CREATE TRIGGER IF NOT EXISTS trg_membre_delete AFTER DELETE ON membre BEGIN
+        DELETE FROM effective_access
+        WHERE user_id = OLD.user_id AND via = 'groupe' AND groupe_id = OLD.groupe_id;
+    END'''),
+]
+
+# Migrations du schéma, appliquées dans l'ordre au démarrage.
+# Chaque entrée (version, requêtes) est exécutée dans sa propre transaction
+# puis enregistrée dans PRAGMA user_version.
+SCHEMA_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_user_pwd_password ON user_pwd (password_id)',
+        'CREATE INDEX IF NOT EXISTS idx_grp_pwd_password ON grp_pwd (password_id)',
+        'CREATE INDEX IF NOT EXISTS idx_membre_groupe ON membre (groupe_id)',
+        'CREATE INDEX IF NOT EXISTS idx_password_created_by ON password (created_by)',
+    ]),
+    # Droits d'accès matérialisés, tenus à jour par triggers (désactivés par la migration 5)
+    (2, [
+        '''CREATE TABLE IF NOT EXISTS effective_access (
+            user_id TEXT NOT NULL,
+            password_id TEXT NOT NULL,
+            via TEXT NOT NULL,
+            groupe_id TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (user_id, password_id, via, groupe_id)
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_effective_access_password ON effective_access (password_id)',
+        *(sql for _, sql in EFFECTIVE_ACCESS_TRIGGERS),
+        'DELETE FROM effective_access',
+        f'INSERT INTO effective_access {EFFECTIVE_ACCESS_SOURCE}',
+    ]),
+    # Pagination par clé (created_at, id) des mots de passe créés par un utilisateur
+    (3, [
+        'CREATE INDEX IF NOT EXISTS idx_password_created_by_date ON password (created_by, created_at, id)',
+        'DROP INDEX IF EXISTS idx_password_created_by',
+    ]),
+    # Index plein texte des intitulés (contenu externe : la table password reste la source).
+    # Il est indexé par le rowid implicite de password, que VACUUM peut renuméroter :
+    # passer par Database.vacuum(), qui le reconstruit ensuite.
+    (4, [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS password_fts USING fts5(
+            intitule, content='password', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_password_fts_insert AFTER INSERT ON password BEGIN
+            INSERT INTO password_fts (rowid, intitule) VALUES (NEW.rowid, NEW.intitule);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_password_fts_delete AFTER DELETE ON password BEGIN
+            INSERT INTO password_fts (password_fts, rowid, intitule) VALUES ('delete', OLD.rowid, OLD.intitule);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_password_fts_update AFTER UPDATE OF intitule ON password BEGIN
+            INSERT INTO password_fts (password_fts, rowid, intitule) VALUES ('delete', OLD.rowid, OLD.intitule);
+            INSERT INTO password_fts (rowid, intitule) VALUES (NEW.rowid, NEW.intitule);
+        END''',
+        "INSERT INTO password_fts (password_fts) VALUES ('rebuild')",
+    ]),
+    # effective_access devient optionnelle et désactivée par défaut : les droits sont
+    # résolus par jointures, sans écriture supplémentaire (voir Database.materialize_access)
+    (5, [
+        *(f'DROP TRIGGER IF EXISTS {name}' for name, _ in EFFECTIVE_ACCESS_TRIGGERS),
+        'DELETE FROM effective_access',
+    ]),
+]
+
+# Requêtes des modèles qui doivent s'appuyer sur un index (voir check_indexes)
+INDEXED_QUERIES: Dict[str, str] = {
+    'user_pwd par mot de passe': 'SELECT user_id FROM user_pwd WHERE password_id = ?',
+    'grp_pwd par mot de passe': 'SELECT groupe_id FROM grp_pwd WHERE password_id = ?',
+    'membres d\'un groupe': 'SELECT user_id FROM membre WHERE groupe_id = ?',
+    'mots de passe créés par': 'SELECT id FROM password WHERE created_by = ? ORDER BY created_at, id',
+    'groupes d\'un utilisateur': 'SELECT groupe_id FROM membre WHERE user_id = ?',
+    'utilisateur par email': 'SELECT id FROM app_user WHERE mail = ?',
+    'droit d\'accès': 'SELECT 1 FROM effective_access WHERE user_id = ? AND password_id = ?',
+    'coffre d\'un utilisateur': 'SELECT password_id FROM effective_access WHERE user_id = ?',
+}
+
+# Requêtes préparées conservées par connexion : doit couvrir le registre (queries.py)
+# et les variantes rendues des gabarits, sinon les plus anciennes sont recompilées
+STATEMENT_CACHE_SIZE = 512
+
+# Réglages de l'instance globale `db`, surchargeables par l'environnement
+# (elle est créée à l'import : passer ensuite par db.configure())
+DEFAULT_POOL_SIZE = int(os.environ.get('PASSWORD_MANAGER_POOL_SIZE', '5'))
+DEFAULT_READ_POOL_SIZE = int(os.environ.get('PASSWORD_MANAGER_READ_POOL_SIZE', '5'))
+DEFAULT_PROFILE = os.environ.get('PASSWORD_MANAGER_DB_PROFILE', 'durable')
+
+# Profils de PRAGMA appliqués à chaque nouvelle connexion
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Chaque commit est synchronisé sur disque
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # En WAL, NORMAL ne peut perdre que les derniers commits en cas de coupure
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+}
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]) -> None:
+    """Applique une liste de PRAGMA à une connexion"""
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+class ConnectionPool:
+    """Pool de connexions SQLite partagé entre les threads (emprunt / restitution)"""
+    
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0,
+                 pragmas: Optional[Dict[str, Any]] = None, read_only: bool = False):
+        if size < 1:
+            raise ValueError("La taille du pool doit être au moins 1")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self.read_only = read_only
+        if read_only:
+            # Le mode de journal est fixé par le primaire ; une connexion en lecture seule ne peut pas le changer
+            self.pragmas = {name: value for name, value in self.pragmas.items() if name != 'journal_mode'}
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Crée une nouvelle connexion utilisable depuis n'importe quel thread"""
+        if self.read_only:
+            uri = f'file:{quote(os.path.abspath(self.db_path))}?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+    
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """Vérifie qu'une connexion inactive est toujours utilisable"""
+        try:
+            conn.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Ferme une connexion et libère sa place dans le pool"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Emprunte une connexion, en crée une si le pool n'est pas plein"""
+        while True:
+            if self._closed:
+                raise RuntimeError("Le pool de connexions est fermé")
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError("Aucune connexion disponible dans le pool")
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Restitue une connexion au pool en annulant toute transaction en cours"""
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            self._discard(conn)
+    
+    def close(self) -> None:
+        """Ferme toutes les connexions inactives et refuse les nouveaux emprunts"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+class WriteQueue:
+    """
+    Écrivain unique : les écritures soumises sont exécutées dans l'ordre par un
+    thread propriétaire de sa propre connexion. Les opérations en attente sont
+    regroupées dans une même transaction (au plus `max_batch`, en attendant
+    au plus `max_delay` secondes) et validées par un seul commit ; chaque
+    opération s'exécute dans un SAVEPOINT, de sorte qu'un échec n'annule qu'elle.
+    """
+    
+    def __init__(self, database: 'Database', max_batch: int = 256, max_delay: float = 0.0):
+        if max_batch < 1:
+            raise ValueError("max_batch doit être au moins 1")
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0
+        self.operations = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """Met une opération en file ; le Future reçoit son résultat une fois le commit effectué"""
+        if not self._thread.is_alive():
+            raise RuntimeError("L'écrivain est arrêté")
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+    
+    def _next_batch(self) -> Optional[list]:
+        """Attend une opération puis regroupe celles qui suivent ; None à l'arrêt"""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Arrêt demandé : on termine le lot, puis on s'arrête
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self) -> None:
+        conn = self.database.pool._connect()
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    self._execute(conn, batch)
+                except Exception as e:
+                    # Le thread survit à toute erreur : les opérations non résolues du lot
+                    # échouent et la connexion, dans un état inconnu, est remplacée
+                    self._fail(batch, e)
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    conn = self.database.pool._connect()
+        finally:
+            conn.close()
+    
+    def _execute(self, conn: sqlite3.Connection, batch: list) -> None:
+        """Exécute un lot dans une transaction et résout ses Futures après le commit"""
+        results = []
+        local = self.database._local
+        # Les requêtes des modèles exécutées ici réutilisent la connexion de l'écrivain
+        local.conn, local.depth, local.callbacks = conn, 1, []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with self.database.transaction():
+                        results.append((future, True, func(*args, **kwargs)))
+                except Exception as e:
+                    results.append((future, False, e))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            # Lot annulé (y compris si BEGIN a échoué) : aucune opération n'a été validée
+            self._fail(batch, e)
+            return
+        finally:
+            local.conn, local.depth = None, 0
+            callbacks, local.callbacks = local.callbacks, []
+        self.commits += 1
+        self.operations += len(results)
+        try:
+            # Avant de résoudre les Futures : l'appelant voit déjà les caches invalidés
+            self.database._run_callbacks(callbacks)
+        finally:
+            for future, ok, value in results:
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+    
+    @staticmethod
+    def _fail(batch: list, error: Exception) -> None:
+        """Fait échouer les Futures du lot qui ne sont pas encore résolus"""
+        for future, _, _, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+    
+    def close(self) -> None:
+        """Exécute les opérations déjà en file puis arrête l'écrivain"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
 class Database:
     _instance = None
     
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self, db_path: str = 'password_manager.db'):
-        if not self._initialized:
-            self.db_path = db_path
-            self._create_tables()
-            self._initialized = True
+    def __init__(self, db_path: str = 'password_manager.db', pool_size: Optional[int] = None,
+                 pool_timeout: Optional[float] = None, profile: Optional[str] = None,
+                 read_pool_size: Optional[int] = None):
+        if self._initialized:
+            # Singleton : des réglages différents seraient ignorés silencieusement
+            requested = {'db_path': db_path, 'pool_size': pool_size, 'pool_timeout': pool_timeout,
+                         'profile': profile, 'read_pool_size': read_pool_size}
+            conflicts = [name for name, value in requested.items()
+                         if value is not None and value != self.settings()[name]]
+            if conflicts:
+                raise ValueError(f"Base déjà initialisée avec d'autres réglages ({', '.join(conflicts)}) : "
+                                 "utilisez db.configure()")
+            return
+        self.db_path = db_path
+        self._local = threading.local()
+        self.pool = self.read_pool = None
+        self._configure(DEFAULT_POOL_SIZE if pool_size is None else pool_size,
+                        30.0 if pool_timeout is None else pool_timeout,
+                        profile or DEFAULT_PROFILE,
+                        DEFAULT_READ_POOL_SIZE if read_pool_size is None else read_pool_size)
+        self.writer: Optional[WriteQueue] = None
+        self._writer_lock = threading.Lock()
+        self.route_writes = False
+        self._create_tables()
+        self.migrate()
+        self.access_materialized = self._access_triggers_installed()
+        self._initialized = True
+    
+    def _configure(self, pool_size: int, pool_timeout: float, profile: str, read_pool_size: int) -> None:
+        """Crée les pools de connexions avec les réglages donnés"""
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Profil de PRAGMA inconnu : {profile}")
+        pool = ConnectionPool(self.db_path, pool_size, pool_timeout, PRAGMA_PROFILES[profile])
+        # Lectures hors transaction sur des connexions en lecture seule (0 : tout sur le primaire)
+        read_pool = (ConnectionPool(self.db_path, read_pool_size, pool_timeout, PRAGMA_PROFILES[profile],
+                                    read_only=True)
+                     if read_pool_size else None)
+        self.profile = profile
+        self.pragmas = PRAGMA_PROFILES[profile]
+        self.pool, self.read_pool = pool, read_pool
+    
+    def settings(self) -> Dict[str, Any]:
+        """Réglages courants de la base"""
+        return {
+            'db_path': self.db_path,
+            'pool_size': self.pool.size,
+            'pool_timeout': self.pool.timeout,
+            'profile': self.profile,
+            'read_pool_size': self.read_pool.size if self.read_pool else 0,
+        }
+    
+    def configure(self, pool_size: Optional[int] = None, pool_timeout: Optional[float] = None,
+                  profile: Optional[str] = None, read_pool_size: Optional[int] = None) -> None:
+        """
+        Change les réglages de l'instance existante : l'écrivain est arrêté et les
+        pools sont recréés (les connexions empruntées sont fermées à leur restitution).
+        """
+        if self.in_transaction():
+            raise RuntimeError("Impossible de reconfigurer la base pendant une transaction")
+        current = self.settings()
+        old_pools = (self.pool, self.read_pool)
+        self._configure(current['pool_size'] if pool_size is None else pool_size,
+                        current['pool_timeout'] if pool_timeout is None else pool_timeout,
+                        profile or current['profile'],
+                        current['read_pool_size'] if read_pool_size is None else read_pool_size)
+        with self._writer_lock:
+            writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.close()
+        for pool in old_pools:
+            if pool is not None:
+                pool.close()
     
     def open_database(self) -> sqlite3.Connection:
-        """Ouvre une connexion à la base de données"""
-        return sqlite3.connect(self.db_path)
+        """Ouvre une connexion indépendante du pool (à fermer par l'appelant)"""
+        conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        apply_pragmas(conn, self.pragmas)
+        return conn
     
     def close_database(self, conn: sqlite3.Connection) -> None:
         """Ferme la connexion à la base de données"""
         if conn:
             conn.close()
     
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Emprunte une connexion du pool le temps du bloc with"""
+        # Dans une transaction, on réutilise la connexion du thread courant
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self.pool.acquire()
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+    
+    @contextmanager
+    def read_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Connexion pour une lecture : celle du thread s'il est dans une transaction
+        ou un instantané, sinon une connexion en lecture seule (le primaire si
+        aucun pool de lecture n'est configuré ou en mode read_your_writes).
+        """
+        conn = getattr(self._local, 'conn', None) or getattr(self._local, 'snapshot', None)
+        if conn is not None:
+            yield conn
+            return
+        pool = self.pool if self.read_pool is None or getattr(self._local, 'primary', False) else self.read_pool
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+    
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """
+        Lectures cohérentes : toutes les requêtes du bloc voient le même état
+        de la base (instantané WAL), sans bloquer l'écrivain.
+        """
+        if getattr(self._local, 'conn', None) or getattr(self._local, 'snapshot', None):
+            with self.read_connection() as conn:
+                yield conn
+            return
+        pool = self.read_pool or self.pool
+        conn = pool.acquire()
+        try:
+            conn.execute('BEGIN')
+            # L'instantané est figé à la première lecture
+            conn.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+            self._local.snapshot = conn
+            yield conn
+        finally:
+            self._local.snapshot = None
+            pool.release(conn)
+    
+    @contextmanager
+    def read_your_writes(self) -> Iterator[None]:
+        """Envoie les lectures du thread vers le primaire le temps du bloc"""
+        previous = getattr(self._local, 'primary', False)
+        self._local.primary = True
+        try:
+            yield
+        finally:
+            self._local.primary = previous
+    
+    def in_transaction(self) -> bool:
+        """Indique si le thread courant est dans un bloc transaction()"""
+        return getattr(self._local, 'depth', 0) > 0
+    
+    def _commit(self, conn: sqlite3.Connection) -> None:
+        """Valide la requête, sauf si elle fait partie d'une transaction englobante"""
+        if not self.in_transaction():
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self, immediate: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Regroupe plusieurs requêtes sur une seule connexion et un seul commit.
+        Les blocs imbriqués utilisent des SAVEPOINT : une erreur dans un bloc
+        interne n'annule que ce bloc si l'exception est rattrapée.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            conn = self._local.conn
+            savepoint = f'sp_{depth}'
+            conn.execute(f'SAVEPOINT {savepoint}')
+            self._local.depth = depth + 1
+            mark = len(self._local.callbacks)
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+                # Les rappels enregistrés dans le bloc annulé sont abandonnés
+                del self._local.callbacks[mark:]
+                raise
+            else:
+                conn.execute(f'RELEASE {savepoint}')
+            finally:
+                self._local.depth = depth
+            return
+        
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            self._local.conn = conn
+            self._local.depth = 1
+            self._local.callbacks = []
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.conn = None
+                self._local.depth = 0
+                callbacks, self._local.callbacks = self._local.callbacks, []
+        self._run_callbacks(callbacks)
+    
+    def after_commit(self, callback: Callable[..., Any], *args) -> None:
+        """
+        Exécute `callback(*args)` après le commit de la transaction en cours
+        (immédiatement hors transaction) ; abandonné si elle est annulée.
+        """
+        if not self.in_transaction():
+            callback(*args)
+            return
+        self._local.callbacks.append((callback, args))
+    
+    @staticmethod
+    def _run_callbacks(callbacks: List[Tuple[Callable[..., Any], tuple]]) -> None:
+        """Exécute tous les rappels ; la première erreur est relevée à la fin"""
+        error = None
+        for callback, args in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+    
+    def start_writer(self, max_batch: int = 256, max_delay: float = 0.0,
+                     route_writes: bool = False) -> WriteQueue:
+        """
+        Démarre l'écrivain unique (voir WriteQueue). Avec `route_writes`, les
+        query_insert/query_execute/... hors transaction passent aussi par lui.
+        """
+        with self._writer_lock:
+            if self.writer is None:
+                self.writer = WriteQueue(self, max_batch, max_delay)
+            self.route_writes = route_writes
+        return self.writer
+    
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Exécute `func` (par exemple Password.create) dans l'écrivain unique,
+        regroupée avec les autres écritures en attente ; retourne un Future.
+        """
+        return self.start_writer(route_writes=self.route_writes).submit(func, *args, **kwargs)
+    
+    def _routed(self) -> bool:
+        """Indique si une écriture hors transaction doit passer par l'écrivain"""
+        return self.route_writes and not self.in_transaction()
+    
+    def close(self) -> None:
+        """Arrête l'écrivain et ferme proprement le pool de connexions"""
+        if self.writer is not None:
+            self.writer.close()
+        self.pool.close()
+        if self.read_pool is not None:
+            self.read_pool.close()
+    
     def query_insert(self, query: str, params: tuple = ()) -> int:
         """Exécute une requête INSERT et retourne l'ID du dernier élément inséré"""
-        conn = self.open_database()
-        try:
+        if self._routed():
+            return self.submit(self.query_insert, query, params).result()
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
+            with registry.timed(query):
+                cursor.execute(query, params)
+            self._commit(conn)
             return cursor.lastrowid
-        finally:
-            self.close_database(conn)
+    
+    def query_insert_many(self, query: str, params_seq: Iterable[tuple]) -> int:
+        """Exécute une requête INSERT pour chaque jeu de paramètres et retourne le nombre de lignes"""
+        if self._routed():
+            return self.submit(self.query_insert_many, query, list(params_seq)).result()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            with registry.timed(query):
+                cursor.executemany(query, params_seq)
+            self._commit(conn)
+            return cursor.rowcount
+    
+    def query_execute(self, query: str, params: tuple = ()) -> int:
+        """Exécute une requête d'écriture et retourne le nombre de lignes modifiées"""
+        if self._routed():
+            return self.submit(self.query_execute, query, params).result()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            with registry.timed(query):
+                cursor.execute(query, params)
+            self._commit(conn)
+            return cursor.rowcount
+    
+    def query_execute_many(self, query: str, params_seq: Iterable[tuple]) -> int:
+        """Exécute une requête d'écriture pour chaque jeu de paramètres et retourne le nombre de lignes modifiées"""
+        if self._routed():
+            return self.submit(self.query_execute_many, query, list(params_seq)).result()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            with registry.timed(query):
+                cursor.executemany(query, params_seq)
+            self._commit(conn)
+            return cursor.rowcount
     
     def query_update(self, query: str, params: tuple = ()) -> None:
         """Exécute une requête UPDATE"""
-        conn = self.open_database()
-        try:
+        if self._routed():
+            return self.submit(self.query_update, query, params).result()
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-        finally:
-            self.close_database(conn)
+            with registry.timed(query):
+                cursor.execute(query, params)
+            self._commit(conn)
     
     def query_delete(self, query: str, params: tuple = ()) -> None:
         """Exécute une requête DELETE"""
-        conn = self.open_database()
-        try:
+        if self._routed():
+            return self.submit(self.query_delete, query, params).result()
+        with self.connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-        finally:
-            self.close_database(conn)
+            with registry.timed(query):
+                cursor.execute(query, params)
+            self._commit(conn)
     
     def query_one(self, query: str, params: tuple = (), model_class: Type[T] = None) -> Optional[T]:
         """Exécute une requête et retourne un seul résultat"""
-        conn = self.open_database()
-        try:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            row = cursor.fetchone()
+            with registry.timed(query):
+                cursor.execute(query, params)
+                row = cursor.fetchone()
             if row and model_class:
                 return model_class(*row)
             return row
-        finally:
-            self.close_database(conn)
     
     def query_many(self, query: str, params: tuple = (), model_class: Type[T] = None) -> List[T]:
         """Exécute une requête et retourne plusieurs résultats"""
-        conn = self.open_database()
-        try:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            with registry.timed(query):
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
             if model_class and rows:
                 return [model_class(*row) for row in rows]
             return rows
-        finally:
-            self.close_database(conn)
+    
+    def _access_triggers_installed(self) -> bool:
+        """Indique si les triggers de effective_access sont en place"""
+        names = [name for name, _ in EFFECTIVE_ACCESS_TRIGGERS]
+        count = self.query_one(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(names))})",
+            tuple(names)
+        )[0]
+        return count == len(names)
+    
+    def materialize_access(self, enabled: bool = True) -> int:
+        """
+        Active ou désactive la table effective_access et retourne son nombre de droits.
+        Activée, chaque contrôle d'accès est une lecture par clé primaire, mais
+        chaque écriture dans user_pwd, grp_pwd, membre et password la met à jour
+        par trigger : un ajout de membre écrit une ligne par mot de passe du
+        groupe, un partage au groupe une ligne par membre. Désactivée (par
+        défaut), les droits sont résolus par jointures sur les tables de liaison.
+        Le choix est enregistré dans la base ; les autres processus le lisent au démarrage.
+        """
+        with self.transaction() as conn:
+            for name, sql in EFFECTIVE_ACCESS_TRIGGERS:
+                conn.execute(sql if enabled else f'DROP TRIGGER IF EXISTS {name}')
+            conn.execute('DELETE FROM effective_access')
+            if enabled:
+                conn.execute(f'INSERT INTO effective_access {EFFECTIVE_ACCESS_SOURCE}')
+            count = conn.execute('SELECT COUNT(*) FROM effective_access').fetchone()[0]
+        self.access_materialized = enabled
+        return count
+    
+    def access_query(self, name: str, **fields: Any) -> str:
+        """Texte d'une requête de droits, dans sa variante '.materialized' si effective_access est activée"""
+        if self.access_materialized:
+            name += '.materialized'
+        return registry.render(name, **fields) if fields else registry[name]
+    
+    def _require_access_table(self) -> None:
+        if not self.access_materialized:
+            raise RuntimeError("La table effective_access n'est pas activée (voir materialize_access)")
+    
+    def rebuild_effective_access(self) -> int:
+        """Reconstruit entièrement effective_access et retourne le nombre de droits"""
+        self._require_access_table()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM effective_access')
+            conn.execute(f'INSERT INTO effective_access {EFFECTIVE_ACCESS_SOURCE}')
+            return conn.execute('SELECT COUNT(*) FROM effective_access').fetchone()[0]
+    
+    def verify_effective_access(self) -> Dict[str, int]:
+        """Compare effective_access aux tables de liaison : droits manquants et en trop"""
+        self._require_access_table()
+        materialized = 'SELECT user_id, password_id, via, groupe_id FROM effective_access'
+        expected = f'SELECT * FROM ({EFFECTIVE_ACCESS_SOURCE})'
+        missing = self.query_one(f'SELECT COUNT(*) FROM ({expected} EXCEPT {materialized})')[0]
+        extra = self.query_one(f'SELECT COUNT(*) FROM ({materialized} EXCEPT {expected})')[0]
+        return {'missing': missing, 'extra': extra}
+    
+    def query_iter(self, query: str, params: tuple = (), batch_size: int = 500) -> Iterator[tuple]:
+        """Exécute une requête et itère sur les lignes par paquets (fetchmany), sans tout charger"""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            # Seule l'exécution est mesurée : le parcours dépend du rythme de l'appelant
+            with registry.timed(query):
+                cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    
+    def query_page(self, query: str, params: tuple, order_by: str, page_size: int,
+                   after: Optional[tuple], cursor_of: Callable[[tuple], tuple]) -> Tuple[List[tuple], Optional[tuple]]:
+        """
+        Pagination par clé (keyset) : `query` contient le marqueur {keyset} dans
+        sa clause WHERE, remplacé par une comparaison sur les colonnes `order_by`,
+        et se termine par ORDER BY `order_by`.
+        Retourne la page et le curseur de la page suivante (None si c'est la dernière).
+        """
+        keyset, keyset_params = '', ()
+        if after is not None:
+            keyset = f"AND ({order_by}) > ({', '.join('?' * len(after))})"
+            keyset_params = tuple(after)
+        name = registry.name_of(query)
+        sql = registry.render(name, keyset=keyset) if name in registry else query.format(keyset=keyset)
+        sql += '\nLIMIT ?'
+        with self.read_connection() as conn, registry.timed(sql, name):
+            rows = conn.execute(sql, (*params, *keyset_params, page_size)).fetchall()
+        cursor = cursor_of(rows[-1]) if len(rows) == page_size else None
+        return rows, cursor
     
     def _create_tables(self):
-        with self.open_database() as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
             
             # Table utilisateur
@@ -146,13 +895,78 @@ class Database:
                 )
             ''')
             
+            # Table de liaison utilisateur-mot de passe (many-to-many)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_pwd (
+                    user_id TEXT,
+                    password_id TEXT,
+                    PRIMARY KEY (user_id, password_id),
+                    FOREIGN KEY (user_id) REFERENCES app_user(id),
+                    FOREIGN KEY (password_id) REFERENCES password(id)
+                )
+            ''')
+            
             conn.commit()
     
+    def schema_version(self) -> int:
+        """Retourne la version du schéma (PRAGMA user_version)"""
+        return self.query_one('PRAGMA user_version')[0]
+    
+    def migrate(self) -> int:
+        """Applique les migrations en attente et retourne la version du schéma"""
+        version = self.schema_version()
+        for target, statements in SCHEMA_MIGRATIONS:
+            if target <= version:
+                continue
+            with self.transaction() as conn:
+                # Relecture sous verrou : un autre processus a pu migrer entre temps
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= target:
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {target}')
+            version = target
+        return version
+    
+    def rebuild_search_index(self) -> None:
+        """Reconstruit l'index plein texte password_fts à partir de la table password"""
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO password_fts (password_fts) VALUES ('rebuild')")
+    
+    def vacuum(self) -> None:
+        """
+        Compacte la base (VACUUM) puis reconstruit password_fts : VACUUM peut
+        renuméroter les rowid implicites de password, sur lesquels l'index est construit.
+        À lancer service arrêté : entre les deux étapes, une recherche pourrait
+        renvoyer de mauvaises lignes.
+        """
+        if self.in_transaction():
+            raise RuntimeError("VACUUM est impossible dans une transaction")
+        with self.connection() as conn:
+            conn.execute('VACUUM')
+        self.rebuild_search_index()
+    
+    def check_indexes(self) -> List[Dict[str, str]]:
+        """
+        Passe les requêtes critiques dans EXPLAIN QUERY PLAN et retourne
+        celles qui parcourent encore toute une table.
+        """
+        missing = []
+        with self.connection() as conn:
+            for name, query in INDEXED_QUERIES.items():
+                params = (None,) * query.count('?')
+                for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params):
+                    detail = row[-1]
+                    if detail.startswith('SCAN'):
+                        missing.append({'query': name, 'detail': detail})
+        return missing
+    
     # Alias pour la rétrocompatibilité
     get_connection = open_database
 
 # Instance globale de la base de données
 db = Database()
+atexit.register(db.close)
 
 class Model:
     """Classe de base pour tous les modèles"""
@@ -162,6 +976,21 @@ class Model:
         """Retourne l'instance de la base de données"""
         return db
     
+    @classmethod
+    def transaction(cls):
+        """Ouvre une transaction (voir Database.transaction)"""
+        return cls._get_db().transaction()
+    
+    @classmethod
+    def snapshot(cls):
+        """Ouvre un instantané de lecture (voir Database.snapshot)"""
+        return cls._get_db().snapshot()
+    
+    @classmethod
+    def access_query(cls, name: str, **fields: Any) -> str:
+        """Texte d'une requête de droits selon le mode de la base (voir Database.access_query)"""
+        return cls._get_db().access_query(name, **fields)
+    
     @classmethod
     def query_one(cls, query: str, params: tuple = ()) -> Optional[Tuple]:
         """Exécute une requête et retourne un seul résultat"""
@@ -172,11 +1001,37 @@ class Model:
         """Exécute une requête et retourne plusieurs résultats"""
         return cls._get_db().query_many(query, params)
     
+    @classmethod
+    def query_iter(cls, query: str, params: tuple = (), batch_size: int = 500) -> Iterator[Tuple]:
+        """Exécute une requête et itère sur les résultats par paquets"""
+        return cls._get_db().query_iter(query, params, batch_size)
+    
+    @classmethod
+    def query_page(cls, query: str, params: tuple, order_by: str, page_size: int,
+                   after: Optional[tuple], cursor_of: Callable[[tuple], tuple]) -> Tuple[List[Tuple], Optional[tuple]]:
+        """Retourne une page de résultats et le curseur suivant (voir Database.query_page)"""
+        return cls._get_db().query_page(query, params, order_by, page_size, after, cursor_of)
+    
     @classmethod
     def query_insert(cls, query: str, params: tuple = ()) -> int:
         """Exécute une requête INSERT et retourne l'ID du dernier élément inséré"""
         return cls._get_db().query_insert(query, params)
     
+    @classmethod
+    def query_insert_many(cls, query: str, params_seq: Iterable[tuple]) -> int:
+        """Exécute une requête INSERT pour chaque jeu de paramètres"""
+        return cls._get_db().query_insert_many(query, params_seq)
+    
+    @classmethod
+    def query_execute(cls, query: str, params: tuple = ()) -> int:
+        """Exécute une requête d'écriture et retourne le nombre de lignes modifiées"""
+        return cls._get_db().query_execute(query, params)
+    
+    @classmethod
+    def query_execute_many(cls, query: str, params_seq: Iterable[tuple]) -> int:
+        """Exécute une requête d'écriture pour chaque jeu de paramètres"""
+        return cls._get_db().query_execute_many(query, params_seq)
+    
     @classmethod
     def query_update(cls, query: str, params: tuple = ()) -> None:
         """Exécute une requête UPDATE"""
@@ -186,3 +1041,44 @@ class Model:
     def query_delete(cls, query: str, params: tuple = ()) -> None:
         """Exécute une requête DELETE"""
         cls._get_db().query_delete(query, params)
+
+
+if __name__ == '__main__':
+    import argparse
+    import re
+    parser = argparse.ArgumentParser(description="Maintenance de la base de données")
+    parser.add_argument('action', choices=['migrate', 'check-indexes', 'enable-access', 'disable-access',
+                                           'verify-access', 'rebuild-access', 'rebuild-search', 'vacuum',
+                                           'queries'])
+    args = parser.parse_args()
+    if args.action == 'migrate':
+        print(f"Schéma en version {db.migrate()}")
+    elif args.action == 'check-indexes':
+        for entry in db.check_indexes():
+            print(f"{entry['query']} : {entry['detail']}")
+    elif args.action == 'queries':
+        # Requêtes du registre et leur plan d'exécution
+        with db.connection() as conn:
+            for name, template in registry.items():
+                sql = template.format(keyset='', placeholders='?')
+                # Un '?' prend le numéro suivant le plus grand déjà attribué (?1, ?2...)
+                count = 0
+                for number in re.findall(r'\?(\d*)', sql):
+                    count = max(count, int(number)) if number else count + 1
+                plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', (None,) * count).fetchall()
+                print(f"{name}\n    " + ('\n    '.join(row[-1] for row in plan) or '-'))
+    elif args.action in ('enable-access', 'disable-access'):
+        # À faire service arrêté : les processus en cours gardent le mode lu au démarrage
+        count = db.materialize_access(args.action == 'enable-access')
+        print(f"effective_access {'activée' if db.access_materialized else 'désactivée'} ({count} droits)")
+    elif args.action == 'rebuild-search':
+        db.rebuild_search_index()
+        print("Index plein texte reconstruit")
+    elif args.action == 'vacuum':
+        db.vacuum()
+        print("Base compactée, index plein texte reconstruit")
+    elif args.action == 'rebuild-access':
+        print(f"{db.rebuild_effective_access()} droits d'accès reconstruits")
+    else:
+        report = db.verify_effective_access()
+        print(f"{report['missing']} droit(s) manquant(s), {report['extra']} droit(s) en trop")
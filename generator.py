@@ -0,0 +1,329 @@
+import argparse
+import math
+import os
+import secrets
+import string
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SYMBOLS = "!@#$%^&*"
+DEFAULT_ALPHABET = string.ascii_letters + string.digits + DEFAULT_SYMBOLS
+
+# Caractères facilement confondus à la lecture
+AMBIGUOUS_CHARACTERS = "Il1O0o|`'\""
+
+# Nombre de mots de passe produits par tirage d'entropie
+DEFAULT_BATCH_SIZE = 4096
+
+class EntropyBuffer:
+    """Réserve d'octets os.urandom consommée par petits tirages (évite un appel système par tirage)"""
+
+    def __init__(self, size: int = 65536):
+        self.size = size
+        self._buffer = b''
+        self._pos = 0
+
+    def below(self, n: int) -> int:
+        """Retourne un entier uniforme dans [0, n) pour n <= 256"""
+        limit = 256 - (256 % n)
+        while True:
+            if self._pos >= len(self._buffer):
+                self._buffer = os.urandom(self.size)
+                self._pos = 0
+            value = self._buffer[self._pos]
+            self._pos += 1
+            if value < limit:
+                return value % n
+
+    def shuffle(self, items: list) -> None:
+        """Mélange de Fisher-Yates ; au-delà de 256 éléments on délègue à secrets"""
+        if len(items) > 256:
+            secrets.SystemRandom().shuffle(items)
+            return
+        for i in range(len(items) - 1, 0, -1):
+            j = self.below(i + 1)
+            items[i], items[j] = items[j], items[i]
+
+class ByteMapper:
+    """
+    Convertit des octets aléatoires en caractères d'un alphabet ASCII.
+    Les octets >= limit sont rejetés pour que chaque caractère soit
+    équiprobable ; le tri et la conversion sont faits par bytes.translate.
+    """
+
+    def __init__(self, alphabet: str):
+        alphabet = ''.join(dict.fromkeys(alphabet))
+        if not alphabet:
+            raise ValueError("L'alphabet ne peut pas être vide")
+        if not alphabet.isascii():
+            raise ValueError("L'alphabet doit être composé de caractères ASCII")
+        size = len(alphabet)
+        self.alphabet = alphabet
+        self.limit = 256 - (256 % size)
+        encoded = alphabet.encode('ascii')
+        self.table = bytes(encoded[b % size] if b < self.limit else 0 for b in range(256))
+        self.rejected = bytes(range(self.limit, 256))
+
+    def draw(self, count: int) -> bytes:
+        """Retourne exactement `count` caractères tirés uniformément"""
+        out = bytearray()
+        while len(out) < count:
+            missing = count - len(out)
+            # Marge pour compenser les octets rejetés
+            raw = os.urandom(math.ceil(missing * 256 / self.limit) + 16)
+            out += raw.translate(self.table, self.rejected)
+        return bytes(out[:count])
+
+
+_mappers = {}
+
+def get_mapper(alphabet: str) -> ByteMapper:
+    """Retourne le ByteMapper d'un alphabet, construit une seule fois"""
+    mapper = _mappers.get(alphabet)
+    if mapper is None:
+        mapper = _mappers[alphabet] = ByteMapper(alphabet)
+    return mapper
+
+
+def generate_many(count: int, length: int = 16, alphabet: Optional[str] = None,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+    """Génère `count` mots de passe en flux, par lots tirés d'un seul appel à os.urandom"""
+    if length < 1:
+        raise ValueError("La longueur doit être positive")
+    mapper = get_mapper(alphabet or DEFAULT_ALPHABET)
+    remaining = count
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        chars = mapper.draw(n * length).decode('ascii')
+        for start in range(0, n * length, length):
+            yield chars[start:start + length]
+        remaining -= n
+
+
+class CompiledPolicy:
+    """Tables de tirage précalculées d'une PasswordPolicy"""
+
+    def __init__(self, classes: List[Tuple[str, int]], max_repeat: Optional[int]):
+        self.classes = [(get_mapper(chars), minimum) for chars, minimum in classes]
+        self.alphabet = ''.join(chars for chars, _ in classes)
+        self.mapper = get_mapper(self.alphabet)
+        self.min_length = sum(minimum for _, minimum in classes)
+        self.max_repeat = max_repeat
+        # Pour chaque caractère : sa classe privée de ce caractère (remplacement des répétitions)
+        self.substitutes = {}
+        if max_repeat is not None:
+            for chars, _ in classes:
+                if len(chars) < 2:
+                    raise ValueError("max_repeat exige au moins deux caractères par classe")
+                for char in chars:
+                    self.substitutes[char] = get_mapper(chars.replace(char, ''))
+
+    def generate(self, length: int) -> str:
+        """Génère un mot de passe conforme en une seule passe"""
+        return next(self.generate_many(1, length))
+
+    def generate_many(self, count: int, length: int, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[str]:
+        """
+        Génère `count` mots de passe conformes : les minimums de chaque classe
+        sont tirés en bloc pour tout le lot, puis chaque mot de passe est mélangé.
+        """
+        if length < self.min_length:
+            raise ValueError(f"La politique exige au moins {self.min_length} caractères")
+        free = length - self.min_length
+        entropy = EntropyBuffer()
+        remaining = count
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            pools = [(mapper.draw(n * minimum).decode('ascii'), minimum)
+                     for mapper, minimum in self.classes if minimum]
+            pools.append((self.mapper.draw(n * free).decode('ascii'), free))
+            for i in range(n):
+                chars = []
+                for pool, size in pools:
+                    chars.extend(pool[i * size:(i + 1) * size])
+                entropy.shuffle(chars)
+                if self.max_repeat is not None:
+                    self._break_repeats(chars)
+                yield ''.join(chars)
+            remaining -= n
+
+    def _break_repeats(self, chars: List[str]) -> None:
+        """Remplace les caractères qui dépassent max_repeat par un autre de la même classe"""
+        run = 1
+        for i in range(1, len(chars)):
+            if chars[i] != chars[i - 1]:
+                run = 1
+                continue
+            run += 1
+            if run > self.max_repeat:
+                chars[i] = self.substitutes[chars[i]].draw(1).decode('ascii')
+                run = 1
+
+
+@lru_cache(maxsize=128)
+def compile_policy(classes: Tuple[Tuple[str, int], ...], max_repeat: Optional[int]) -> CompiledPolicy:
+    """Compile une politique ; le résultat est mis en cache par paramètres"""
+    return CompiledPolicy(list(classes), max_repeat)
+
+
+class PasswordPolicy:
+    """
+    Politique de génération : chaque classe reçoit un nombre minimal de
+    caractères (None pour l'exclure, 0 pour l'autoriser sans minimum).
+    """
+
+    def __init__(self, lower: Optional[int] = 1, upper: Optional[int] = 1, digits: Optional[int] = 1,
+                 symbols: Optional[int] = 1, symbol_set: str = DEFAULT_SYMBOLS,
+                 exclude_ambiguous: bool = False, max_repeat: Optional[int] = None):
+        if max_repeat is not None and max_repeat < 1:
+            raise ValueError("max_repeat doit être au moins 1")
+        self.lower = lower
+        self.upper = upper
+        self.digits = digits
+        self.symbols = symbols
+        self.symbol_set = symbol_set
+        self.exclude_ambiguous = exclude_ambiguous
+        self.max_repeat = max_repeat
+
+    def _classes(self) -> Tuple[Tuple[str, int], ...]:
+        """Retourne les classes actives sous forme (caractères, minimum)"""
+        excluded = AMBIGUOUS_CHARACTERS if self.exclude_ambiguous else ''
+        classes = []
+        for chars, minimum in ((string.ascii_lowercase, self.lower),
+                               (string.ascii_uppercase, self.upper),
+                               (string.digits, self.digits),
+                               (self.symbol_set, self.symbols)):
+            if minimum is None:
+                continue
+            if minimum < 0:
+                raise ValueError("Le minimum d'une classe ne peut pas être négatif")
+            chars = ''.join(c for c in dict.fromkeys(chars) if c not in excluded)
+            if chars:
+                classes.append((chars, minimum))
+            elif minimum:
+                raise ValueError("Une classe obligatoire ne contient aucun caractère")
+        if not classes:
+            raise ValueError("La politique doit autoriser au moins une classe de caractères")
+        return tuple(classes)
+
+    def compile(self) -> CompiledPolicy:
+        """Retourne la version compilée de la politique (mise en cache)"""
+        return compile_policy(self._classes(), self.max_repeat)
+
+    def generate(self, length: int = 16) -> str:
+        """Génère un mot de passe conforme à la politique"""
+        return self.compile().generate(length)
+
+    def generate_many(self, count: int, length: int = 16) -> Iterator[str]:
+        """Génère `count` mots de passe conformes en flux"""
+        return self.compile().generate_many(count, length)
+
+
+class GenerationStats:
+    """Débit de génération mesuré par processus de travail"""
+
+    def __init__(self):
+        self.workers: Dict[int, List[float]] = {}
+
+    def record(self, pid: int, count: int, seconds: float) -> None:
+        """Ajoute un lot produit par le processus `pid`"""
+        totals = self.workers.setdefault(pid, [0, 0.0])
+        totals[0] += count
+        totals[1] += seconds
+
+    @property
+    def total(self) -> int:
+        return sum(int(count) for count, _ in self.workers.values())
+
+    def report(self) -> List[str]:
+        """Retourne une ligne de débit par processus"""
+        lines = []
+        for pid, (count, seconds) in sorted(self.workers.items()):
+            rate = count / seconds if seconds else 0.0
+            lines.append(f"worker {pid} : {int(count)} mots de passe en {seconds:.2f}s ({rate:,.0f}/s)")
+        return lines
+
+
+def _generate_shard(count: int, length: int, alphabet: Optional[str],
+                    policy: Optional['PasswordPolicy']) -> Tuple[int, List[str], float]:
+    """Tâche exécutée dans un processus de travail (entropie tirée de os.urandom localement)"""
+    start = time.perf_counter()
+    if policy is not None:
+        passwords = list(policy.generate_many(count, length))
+    else:
+        passwords = list(generate_many(count, length, alphabet))
+    return os.getpid(), passwords, time.perf_counter() - start
+
+
+def generate_parallel(count: int, length: int = 16, workers: Optional[int] = None,
+                      alphabet: Optional[str] = None, policy: Optional['PasswordPolicy'] = None,
+                      shard_size: int = 100_000, stats: Optional[GenerationStats] = None) -> Iterator[List[str]]:
+    """
+    Répartit la génération sur plusieurs processus et renvoie les lots
+    dans leur ordre d'achèvement. Le nombre de lots en vol est borné pour
+    que la mémoire reste stable quand le consommateur est plus lent.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = [min(shard_size, count - start) for start in range(0, count, shard_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for shard in shards:
+            pending.add(pool.submit(_generate_shard, shard, length, alphabet, policy))
+            if len(pending) < workers * 2:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from _collect(done, stats)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from _collect(done, stats)
+
+
+def _collect(futures, stats: Optional[GenerationStats]) -> Iterator[List[str]]:
+    for future in futures:
+        pid, passwords, seconds = future.result()
+        if stats is not None:
+            stats.record(pid, len(passwords), seconds)
+        yield passwords
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Génération de mots de passe en masse")
+    parser.add_argument('--count', type=int, required=True, help="nombre de mots de passe")
+    parser.add_argument('--length', type=int, default=16, help="longueur des mots de passe")
+    parser.add_argument('--workers', type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument('--output', help="fichier de sortie (défaut : sortie standard)")
+    parser.add_argument('--user-id', help="enregistre les mots de passe pour cet utilisateur")
+    parser.add_argument('--prefix', default='generated', help="préfixe des intitulés enregistrés")
+    args = parser.parse_args(argv)
+
+    stats = GenerationStats()
+    start = time.perf_counter()
+    batches = generate_parallel(args.count, args.length, args.workers, stats=stats)
+    if args.user_id:
+        from models import Password
+        index = 0
+        for batch in batches:
+            Password.bulk_create((f"{args.prefix}-{index + i}", value, args.user_id)
+                                 for i, value in enumerate(batch))
+            index += len(batch)
+    else:
+        out = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            for batch in batches:
+                out.write('\n'.join(batch))
+                out.write('\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    elapsed = time.perf_counter() - start
+    for line in stats.report():
+        print(line, file=sys.stderr)
+    print(f"total : {stats.total} mots de passe en {elapsed:.2f}s ({stats.total / elapsed:,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
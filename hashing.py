@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+# Nombre de vérifications simultanées : une rafale de connexions ne peut pas saturer le processus
+VERIFY_WORKERS = 4
+
+SCRYPT_AVAILABLE = hasattr(hashlib, 'scrypt')
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+class PasswordHasher:
+    """
+    Hachage salé et coûteux des mots de passe utilisateurs.
+    Le format stocké embarque l'algorithme et ses paramètres :
+        scrypt$<n>$<r>$<p>$<sel>$<empreinte>
+        pbkdf2_sha256$<itérations>$<sel>$<empreinte>
+    Les anciennes empreintes SHA-256 hexadécimales non salées restent vérifiables.
+    """
+
+    def __init__(self, algorithm: str = 'scrypt' if SCRYPT_AVAILABLE else 'pbkdf2_sha256',
+                 n: int = 2 ** 14, r: int = 8, p: int = 1, iterations: int = 600_000,
+                 salt_size: int = 16, key_size: int = 32):
+        if algorithm not in ('scrypt', 'pbkdf2_sha256'):
+            raise ValueError(f"Algorithme de hachage inconnu : {algorithm}")
+        if algorithm == 'scrypt' and not SCRYPT_AVAILABLE:
+            raise ValueError("scrypt n'est pas disponible avec cette version d'OpenSSL")
+        self.algorithm = algorithm
+        self.n = n
+        self.r = r
+        self.p = p
+        self.iterations = iterations
+        self.salt_size = salt_size
+        self.key_size = key_size
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=key_size)
+
+    @staticmethod
+    def _pbkdf2(password: str, salt: bytes, iterations: int, key_size: int) -> bytes:
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, key_size)
+
+    def hash(self, password: str) -> str:
+        """Retourne l'empreinte encodée d'un mot de passe avec un sel aléatoire"""
+        salt = os.urandom(self.salt_size)
+        if self.algorithm == 'scrypt':
+            key = self._scrypt(password, salt, self.n, self.r, self.p, self.key_size)
+            return f'scrypt${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}'
+        key = self._pbkdf2(password, salt, self.iterations, self.key_size)
+        return f'pbkdf2_sha256${self.iterations}${_b64encode(salt)}${_b64encode(key)}'
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Vérifie un mot de passe en temps constant, quel que soit le format stocké"""
+        parts = encoded.split('$')
+        try:
+            if parts[0] == 'scrypt' and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                expected = _b64decode(parts[5])
+                key = self._scrypt(password, _b64decode(parts[4]), n, r, p, len(expected))
+            elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+                expected = _b64decode(parts[3])
+                key = self._pbkdf2(password, _b64decode(parts[2]), int(parts[1]), len(expected))
+            elif len(parts) == 1:
+                # Ancien format : SHA-256 non salé
+                expected = encoded.encode()
+                key = hashlib.sha256(password.encode()).hexdigest().encode()
+            else:
+                return False
+        except (ValueError, TypeError):
+            return False
+        return hmac.compare_digest(key, expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Indique si l'empreinte a été produite avec d'autres paramètres que les actuels"""
+        parts = encoded.split('$')
+        if self.algorithm == 'scrypt':
+            return parts[:4] != ['scrypt', str(self.n), str(self.r), str(self.p)]
+        return parts[:2] != ['pbkdf2_sha256', str(self.iterations)]
+
+
+def calibrate(target_ms: float = 100.0, algorithm: Optional[str] = None) -> PasswordHasher:
+    """
+    Choisit le coût le plus élevé dont le hachage reste sous `target_ms`
+    millisecondes sur la machine courante.
+    """
+    algorithm = algorithm or PasswordHasher().algorithm
+
+    def measure(hasher: PasswordHasher) -> float:
+        start = time.perf_counter()
+        hasher.hash('calibration')
+        return (time.perf_counter() - start) * 1000
+
+    if algorithm == 'scrypt':
+        best = PasswordHasher('scrypt', n=2 ** 12)
+        n = 2 ** 13
+        while n <= 2 ** 20:
+            candidate = PasswordHasher('scrypt', n=n)
+            if measure(candidate) > target_ms:
+                break
+            best = candidate
+            n *= 2
+        return best
+
+    # PBKDF2 est linéaire en nombre d'itérations : une mesure suffit à extrapoler
+    probe = 100_000
+    elapsed = measure(PasswordHasher('pbkdf2_sha256', iterations=probe))
+    iterations = max(100_000, int(probe * target_ms / max(elapsed, 0.001)))
+    return PasswordHasher('pbkdf2_sha256', iterations=iterations)
+
+
+# Hacheur utilisé par les modèles (remplaçable via set_hasher, par exemple avec calibrate())
+hasher = PasswordHasher()
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Empreinte de référence du hacheur courant : (hacheur, empreinte)
+_dummy: Optional[tuple] = None
+
+def set_hasher(new_hasher: PasswordHasher) -> None:
+    """Remplace le hacheur par défaut ; les empreintes existantes seront migrées à la connexion"""
+    global hasher
+    hasher = new_hasher
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix='hashing')
+        return _pool
+
+def hash_password_async(password: str) -> Future:
+    """Soumet un hachage au pool borné et retourne son Future"""
+    return _get_pool().submit(hasher.hash, password)
+
+def hash_password(password: str) -> str:
+    """Hache un mot de passe avec le hacheur par défaut (dans le pool borné)"""
+    return hash_password_async(password).result()
+
+def hash_passwords(passwords: Iterable[str]) -> List[str]:
+    """Hache un lot de mots de passe en parallèle dans le pool borné"""
+    return list(_get_pool().map(hasher.hash, passwords))
+
+def verify_password_async(password: str, encoded: str) -> Future:
+    """Soumet une vérification au pool borné et retourne son Future"""
+    return _get_pool().submit(hasher.verify, password, encoded)
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Vérifie un mot de passe dans le pool borné"""
+    return verify_password_async(password, encoded).result()
+
+def dummy_hash() -> str:
+    """
+    Empreinte fixe produite par le hacheur courant. La vérifier pour un compte
+    inconnu coûte autant qu'une vraie vérification : la durée de la réponse ne
+    révèle pas si l'email existe.
+    """
+    global _dummy
+    current = _dummy
+    if current is None or current[0] is not hasher:
+        current = (hasher, hasher.hash(os.urandom(16).hex()))
+        _dummy = current
+    return current[1]
+
+def needs_rehash(encoded: str) -> bool:
+    """Indique si l'empreinte doit être recalculée avec le hacheur par défaut"""
+    return hasher.needs_rehash(encoded)
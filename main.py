@@ -16,6 +16,7 @@ def print_user_menu(user):
     print("3. Créer un groupe")
     print("4. Voir mes groupes")
     print("5. Gérer un groupe")
+    print("6. Rechercher un mot de passe")
     print("0. Se déconnecter")
     return input("Choisissez une option: ")
 
@@ -77,16 +78,36 @@ def generate_password(user):
     except ValueError:
         print("Veuillez entrer un nombre valide.")
 
-def view_passwords(user):
+def view_passwords(user, page_size=20):
     print("\n=== Mes Mots de Passe ===")
-    passwords = user.get_passwords()
+    passwords, cursor = user.page_passwords(page_size)
     
     if not passwords:
         print("Aucun mot de passe enregistré.")
         return
     
-    for i, pwd in enumerate(passwords, 1):
-        print(f"{i}. {pwd['intitule']} - {pwd['valeur']} (créé le {pwd['created_at']})")
+    i = 0
+    while True:
+        for pwd in passwords:
+            i += 1
+            print(f"{i}. {pwd['intitule']} - {pwd['valeur']} (créé le {pwd['created_at']})")
+        if cursor is None:
+            break
+        if input("Entrée pour la page suivante, 'q' pour arrêter: ").lower() == 'q':
+            break
+        passwords, cursor = user.page_passwords(page_size, cursor)
+
+def search_passwords(user):
+    print("\n=== Rechercher un Mot de Passe ===")
+    query = input("Recherche: ")
+    results = Password.search(user.id, query)
+    
+    if not results:
+        print("Aucun résultat.")
+        return
+    
+    for i, pwd in enumerate(results, 1):
+        print(f"{i}. {pwd.intitule} - {pwd.valeur_chiffree} (créé le {pwd.created_at})")
 
 def create_group(user):
     print("\n=== Créer un Groupe ===")
@@ -100,15 +121,15 @@ def create_group(user):
 
 def view_groups(user):
     print("\n=== Mes Groupes ===")
-    groupes = Groupe.get_by_user(user.id)
+    groupes = Groupe.list_for_user_with_stats(user.id)
     
     if not groupes:
         print("Vous n'êtes dans aucun groupe.")
         return []
     
     for i, groupe in enumerate(groupes, 1):
-        admin = " (Admin)" if groupe.admin_id == user.id else ""
-        print(f"{i}. {groupe.nom}{admin}")
+        admin = " (Admin)" if groupe.is_admin(user.id) else ""
+        print(f"{i}. {groupe.nom}{admin} - {groupe.member_count} membre(s)")
     
     return groupes
 
@@ -122,16 +143,8 @@ def manage_group(user, groupe):
                 continue
                 
             email = input("Email du membre à ajouter: ")
-            # Ici, vous devriez chercher l'utilisateur par email
-            # Pour simplifier, on suppose que l'ID est entré directement
-            try:
-                member_id = int(input("ID du membre: "))
-                if groupe.add_member(member_id, user.id):
-                    print("Membre ajouté avec succès!")
-                else:
-                    print("Impossible d'ajouter ce membre.")
-            except ValueError:
-                print("ID invalide.")
+            result = groupe.add_member_by_email(email, user.id)
+            print(result['message'])
                 
         elif choice == '2':  # Retirer un membre
             if groupe.admin_id != user.id:
@@ -231,6 +244,8 @@ def main():
                             manage_group(current_user, groupe)
                     except (ValueError, IndexError):
                         print("Choix invalide.")
+            elif choice == '6':  # Rechercher un mot de passe
+                search_passwords(current_user)
             elif choice == '0':  # Se déconnecter
                 current_user = None
                 print("Déconnexion réussie.")
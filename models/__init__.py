@@ -21,63 +21,33 @@ class Model:
     @classmethod
     def query_insert(cls, query: str, params: tuple = ()) -> int:
         """Exécute une requête INSERT et retourne l'ID du dernier élément inséré"""
-        conn = cls.open_database()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.lastrowid
-        finally:
-            cls.close_database(conn)
+        return db.query_insert(query, params)
     
     @classmethod
     def query_update(cls, query: str, params: tuple = ()) -> None:
         """Exécute une requête UPDATE"""
-        conn = cls.open_database()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-        finally:
-            cls.close_database(conn)
+        db.query_update(query, params)
     
     @classmethod
     def query_delete(cls, query: str, params: tuple = ()) -> None:
         """Exécute une requête DELETE"""
-        conn = cls.open_database()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-        finally:
-            cls.close_database(conn)
+        db.query_delete(query, params)
     
     @classmethod
     def query_one(cls, query: str, params: tuple = ()) -> Optional[Tuple]:
         """Exécute une requête et retourne un seul résultat"""
-        conn = cls.open_database()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchone()
-        finally:
-            cls.close_database(conn)
+        return db.query_one(query, params)
     
     @classmethod
     def query_many(cls, query: str, params: tuple = ()) -> List[Tuple]:
         """Exécute une requête et retourne plusieurs résultats"""
-        conn = cls.open_database()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
-        finally:
-            cls.close_database(conn)
+        return db.query_many(query, params)
 
 # Imports des modèles
 from .user import User
 from .groupe import Groupe
 from .password import Password
+from .vault import Vault
 
 # Expose les modèles pour une importation plus facile
-__all__ = ['User', 'Groupe', 'Password']
+__all__ = ['User', 'Groupe', 'Password', 'Vault']
@@ -1,17 +1,25 @@
 import uuid
 import sqlite3
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from database import Model, db
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from database import Model, db, chunked
 from .user import User
+from strength import estimator
+from cache import invalidate, lookup
+from queries import registry
+import aio
 
 class Groupe(Model):
-    def __init__(self, id: str, nom: str, admin_id: str, created_at: Optional[str] = None):
+    def __init__(self, id: str, nom: str, admin_id: str, created_at: Optional[str] = None,
+                 member_count: Optional[int] = None, password_count: Optional[int] = None):
         super().__init__()
         self.id = id
         self.nom = nom
         self.admin_id = admin_id
         self.created_at = created_at or datetime.now().isoformat()
+        # Compteurs mis en cache (None tant qu'ils n'ont pas été lus)
+        self.member_count = member_count
+        self.password_count = password_count
     
     @classmethod
     def create(cls, nom: str, admin_id: str) -> 'Groupe':
@@ -19,42 +27,67 @@ class Groupe(Model):
         groupe_id = str(uuid.uuid4())
         created_at = datetime.now().isoformat()
         
-        # Création du groupe
-        super().query_insert(
-            'INSERT INTO groupe (id, nom, admin_id, created_at) VALUES (?, ?, ?, ?)',
-            (groupe_id, nom, admin_id, created_at)
-        )
-        
-        # Ajout de l'admin comme membre du groupe
-        super().query_insert(
-            'INSERT INTO membre (user_id, groupe_id) VALUES (?, ?)',
-            (admin_id, groupe_id)
-        )
+        with cls.transaction():
+            # Création du groupe
+            super().query_insert(registry['groupe.insert'], (groupe_id, nom, admin_id, created_at))
+            
+            # Ajout de l'admin comme membre du groupe
+            super().query_insert(registry['membre.insert'], (admin_id, groupe_id))
         
-        return cls(groupe_id, nom, admin_id, created_at)
+        return cls(groupe_id, nom, admin_id, created_at, member_count=1, password_count=0)
+    
+    @classmethod
+    def bulk_create(cls, entries: Iterable[Tuple[str, str]], chunk_size: int = 1000) -> List['Groupe']:
+        """Crée des groupes en masse à partir de tuples (nom, admin_id)"""
+        groupes = []
+        with cls.transaction():
+            for chunk in chunked(entries, chunk_size):
+                created_at = datetime.now().isoformat()
+                batch = [cls(str(uuid.uuid4()), nom, admin_id, created_at, member_count=1, password_count=0)
+                         for nom, admin_id in chunk]
+                super().query_insert_many(
+                    registry['groupe.insert'],
+                    [(g.id, g.nom, g.admin_id, g.created_at) for g in batch]
+                )
+                super().query_insert_many(
+                    registry['membre.insert'],
+                    [(g.admin_id, g.id) for g in batch]
+                )
+                groupes.extend(batch)
+        return groupes
     
     @classmethod
     def get_by_id(cls, groupe_id: str) -> Optional['Groupe']:
         """Récupère un groupe par son ID"""
-        row = super().query_one(
-            'SELECT id, nom, admin_id, created_at FROM groupe WHERE id = ?',
-            (groupe_id,)
+        return lookup(
+            ('groupe', groupe_id),
+            lambda: cls.query_one(registry['groupe.by_id'], (groupe_id,)),
+            cls
         )
-        if row:
-            return cls(*row)
-        return None
     
     @classmethod
     def get_by_user(cls, user_id: str) -> List['Groupe']:
         """Récupère tous les groupes d'un utilisateur"""
-        rows = super().query_many('''
-            SELECT g.id, g.nom, g.admin_id, g.created_at
-            FROM groupe g
-            JOIN membre m ON g.id = m.groupe_id
-            WHERE m.user_id = ?
-        ''', (user_id,))
+        rows = super().query_many(registry['groupe.by_user'], (user_id,))
+        return [cls(*row) for row in rows]
+    
+    @classmethod
+    def list_for_user_with_stats(cls, user_id: str) -> List['Groupe']:
+        """
+        Récupère les groupes d'un utilisateur avec leurs nombres de membres et
+        de mots de passe, en une seule requête
+        """
+        rows = super().query_many(registry['groupe.by_user_with_stats'], (user_id,))
         return [cls(*row) for row in rows]
     
+    def is_admin(self, user_id: str) -> bool:
+        """Indique si l'utilisateur est l'administrateur du groupe"""
+        return self.admin_id == user_id
+    
+    def is_member(self, user_id: str) -> bool:
+        """Indique si l'utilisateur est membre du groupe"""
+        return super().query_one(registry['membre.exists'], (user_id, self.id)) is not None
+    
     def add_member_by_email(self, email: str, added_by: str) -> dict:
         """
         Ajoute un utilisateur au groupe en utilisant son email
@@ -69,19 +102,16 @@ class Groupe(Model):
             return {'success': False, 'message': f"Aucun utilisateur trouvé avec l'email {email}"}
             
         # Vérifier si l'utilisateur est déjà membre du groupe
-        existing_member = super().query_one(
-            'SELECT 1 FROM membre WHERE user_id = ? AND groupe_id = ?',
-            (user.id, self.id)
-        )
+        existing_member = super().query_one(registry['membre.exists'], (user.id, self.id))
         if existing_member:
             return {'success': False, 'message': "Cet utilisateur est déjà membre du groupe"}
         
         # Ajouter l'utilisateur au groupe
         try:
-            super().query_insert(
-                'INSERT INTO membre (user_id, groupe_id) VALUES (?, ?)',
-                (user.id, self.id)
-            )
+            super().query_insert(registry['membre.insert'], (user.id, self.id))
+            invalidate(('groupe', self.id))
+            if self.member_count is not None:
+                self.member_count += 1
             return {
                 'success': True,
                 'message': f"Utilisateur {email} ajouté avec succès au groupe"
@@ -89,72 +119,205 @@ class Groupe(Model):
         except Exception as e:
             return {'success': False, 'message': f"Erreur lors de l'ajout au groupe : {str(e)}"}
     
+    def add_members_by_email(self, emails: Iterable[str], added_by: str,
+                             chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """
+        Ajoute plusieurs utilisateurs au groupe à partir de leurs emails, en une transaction.
+        Retourne pour chaque email un dictionnaire avec 'success' et 'message'.
+        """
+        emails = list(dict.fromkeys(emails))
+        if self.admin_id != added_by:
+            message = "Seul l'administrateur peut ajouter des membres"
+            return {email: {'success': False, 'message': message} for email in emails}
+        
+        report = {email: {'success': False, 'message': f"Aucun utilisateur trouvé avec l'email {email}"}
+                  for email in emails}
+        added = 0
+        with self.transaction():
+            for chunk in chunked(emails, chunk_size):
+                # Résolution des emails et détection des membres existants en une requête
+                query = registry.render('membre.resolve_mails', placeholders=', '.join('?' * len(chunk)))
+                rows = super().query_many(query, (self.id, *chunk))
+                new_members = []
+                for mail, user_id, is_member in rows:
+                    if is_member:
+                        report[mail] = {'success': False, 'message': "Cet utilisateur est déjà membre du groupe"}
+                    else:
+                        new_members.append((user_id, self.id))
+                        report[mail] = {'success': True, 'message': f"Utilisateur {mail} ajouté avec succès au groupe"}
+                added += super().query_insert_many(registry['membre.insert_ignore'], new_members)
+        if added:
+            invalidate(('groupe', self.id))
+            if self.member_count is not None:
+                self.member_count += added
+        return report
+    
     # Conserver l'ancienne méthode pour compatibilité
     def add_member(self, user_id: str, added_by: str) -> bool:
-        """Ancienne méthode, à éviter d'utiliser directement"""
-        result = self.add_member_by_email(user_id, added_by)
-        return result['success']
+        """Ajoute un membre à partir de son ID (préférer add_member_by_email)"""
+        if self.admin_id != added_by:
+            return False
+        added = super().query_execute(
+            registry['membre.insert_by_id'],
+            (self.id, user_id)
+        )
+        if added:
+            invalidate(('groupe', self.id))
+            if self.member_count is not None:
+                self.member_count += 1
+        return bool(added)
     
     def remove_member(self, user_id: str, removed_by: str) -> bool:
         """Supprime un membre du groupe"""
         if self.admin_id != removed_by or user_id == self.admin_id:
             return False
         
-        super().query_delete(
-            'DELETE FROM membre WHERE user_id = ? AND groupe_id = ?',
-            (user_id, self.id)
-        )
+        super().query_delete(registry['membre.delete'], (user_id, self.id))
+        invalidate(('groupe', self.id))
+        self.member_count = None
         return True
     
+    def remove_members(self, user_ids: Iterable[str], removed_by: str) -> int:
+        """
+        Retire plusieurs membres du groupe en une transaction (l'administrateur
+        est toujours conservé). Retourne le nombre de membres retirés.
+        """
+        if self.admin_id != removed_by:
+            return 0
+        params = [(user_id, self.id) for user_id in dict.fromkeys(user_ids) if user_id != self.admin_id]
+        removed = super().query_execute_many(registry['membre.delete'], params)
+        if removed:
+            invalidate(('groupe', self.id))
+            if self.member_count is not None:
+                self.member_count -= removed
+        return removed
+    
     def add_password(self, password_id: str, added_by: str) -> bool:
         """Ajoute un mot de passe au groupe"""
         if self.admin_id != added_by:
             return False
         
         try:
-            super().query_insert(
-                'INSERT INTO grp_pwd (groupe_id, password_id) VALUES (?, ?)',
-                (self.id, password_id)
-            )
+            super().query_insert(registry['grp_pwd.insert'], (self.id, password_id))
+            if self.password_count is not None:
+                self.password_count += 1
             return True
         except Exception:
             return False
     
-    def get_members(self) -> List[Dict[str, Any]]:
-        """Récupère tous les membres du groupe"""
-        rows = super().query_many('''
-            SELECT u.id, u.nom, u.prenom, u.mail,
-                   CASE WHEN u.id = ? THEN 1 ELSE 0 END as is_admin
-            FROM app_user u
-            JOIN membre m ON u.id = m.user_id
-            WHERE m.groupe_id = ?
-        ''', (self.admin_id, self.id))
-        
-        return [{
+    @staticmethod
+    def _member_dict(row: tuple) -> Dict[str, Any]:
+        return {
             'id': row[0],
             'nom': row[1],
             'prenom': row[2],
             'mail': row[3],
             'is_admin': bool(row[4])
-        } for row in rows]
+        }
     
-    def get_passwords(self) -> List[Dict[str, Any]]:
-        """Récupère tous les mots de passe du groupe"""
-        rows = super().query_many('''
-            SELECT p.id, p.intitule, p.valeur_chiffree, p.created_at, u.nom, u.prenom
-            FROM password p
-            JOIN grp_pwd gp ON p.id = gp.password_id
-            JOIN app_user u ON p.created_by = u.id
-            WHERE gp.groupe_id = ?
-        ''', (self.id,))
-        
-        return [{
+    def get_members(self) -> List[Dict[str, Any]]:
+        """Récupère tous les membres du groupe"""
+        return list(self.iter_members())
+    
+    def iter_members(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Parcourt en flux les membres du groupe"""
+        query = registry.render('groupe.members', keyset='')
+        for row in super().query_iter(query, (self.admin_id, self.id), batch_size):
+            yield self._member_dict(row)
+    
+    def page_members(self, page_size: int = 50,
+                     after: Optional[tuple] = None) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """Retourne une page de membres et le curseur de la suivante"""
+        rows, cursor = super().query_page(registry['groupe.members'], (self.admin_id, self.id), 'u.created_at, u.id',
+                                          page_size, after, lambda row: (row[5], row[0]))
+        return [self._member_dict(row) for row in rows], cursor
+    
+    def count_members(self) -> int:
+        """Retourne le nombre de membres (mis en cache sur l'objet)"""
+        if self.member_count is None:
+            self.member_count = super().query_one(registry['groupe.count_members'], (self.id,))[0]
+        return self.member_count
+    
+    def count_passwords(self) -> int:
+        """Retourne le nombre de mots de passe partagés (mis en cache sur l'objet)"""
+        if self.password_count is None:
+            self.password_count = super().query_one(registry['groupe.count_passwords'], (self.id,))[0]
+        return self.password_count
+    
+    @staticmethod
+    def _password_dict(row: tuple) -> Dict[str, Any]:
+        return {
             'id': row[0], 
             'intitule': row[1], 
             'valeur': row[2], 
             'created_at': row[3],
             'created_by': f"{row[4]} {row[5]}"
-        } for row in rows]
+        }
+    
+    def get_passwords(self) -> List[Dict[str, Any]]:
+        """Récupère tous les mots de passe du groupe"""
+        return list(self.iter_passwords())
+    
+    def iter_passwords(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Parcourt en flux les mots de passe du groupe, par date de création"""
+        query = registry.render('groupe.passwords', keyset='')
+        for row in super().query_iter(query, (self.id,), batch_size):
+            yield self._password_dict(row)
+    
+    def page_passwords(self, page_size: int = 50,
+                       after: Optional[tuple] = None) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """Retourne une page de mots de passe du groupe et le curseur de la suivante"""
+        rows, cursor = super().query_page(registry['groupe.passwords'], (self.id,), 'p.created_at, p.id',
+                                          page_size, after, lambda row: (row[3], row[0]))
+        return [self._password_dict(row) for row in rows], cursor
+    
+    def audit_passwords(self) -> List[Dict[str, Any]]:
+        """Évalue en une passe la robustesse de tous les mots de passe du groupe"""
+        passwords = self.get_passwords()
+        scores = estimator.estimate_many(p['valeur'] for p in passwords)
+        return [{'id': p['id'], 'intitule': p['intitule'], **score} for p, score in zip(passwords, scores)]
+    
+    # Variantes asynchrones, exécutées hors de la boucle par aio.executor
+    
+    @classmethod
+    async def acreate(cls, nom: str, admin_id: str) -> 'Groupe':
+        """Crée un groupe (écriture via l'écrivain unique)"""
+        return await aio.write(cls.create, nom, admin_id)
+    
+    @classmethod
+    async def aget_by_id(cls, groupe_id: str) -> Optional['Groupe']:
+        """Récupère un groupe par son ID sans bloquer la boucle"""
+        return await aio.read(cls.get_by_id, groupe_id)
+    
+    @classmethod
+    async def aget_by_user(cls, user_id: str) -> List['Groupe']:
+        """Récupère les groupes d'un utilisateur sans bloquer la boucle"""
+        return await aio.read(cls.get_by_user, user_id)
+    
+    @classmethod
+    async def alist_for_user_with_stats(cls, user_id: str) -> List['Groupe']:
+        """Groupes d'un utilisateur avec leurs compteurs, sans bloquer la boucle"""
+        return await aio.read(cls.list_for_user_with_stats, user_id)
+    
+    async def aadd_member_by_email(self, email: str, added_by: str) -> dict:
+        """Ajoute un membre par email (écriture via l'écrivain unique)"""
+        return await aio.write(self.add_member_by_email, email, added_by)
+    
+    async def aremove_member(self, user_id: str, removed_by: str) -> bool:
+        """Retire un membre du groupe (écriture via l'écrivain unique)"""
+        return await aio.write(self.remove_member, user_id, removed_by)
+    
+    async def aadd_password(self, password_id: str, added_by: str) -> bool:
+        """Ajoute un mot de passe au groupe (écriture via l'écrivain unique)"""
+        return await aio.write(self.add_password, password_id, added_by)
+    
+    async def aget_members(self) -> List[Dict[str, Any]]:
+        """Récupère les membres du groupe sans bloquer la boucle"""
+        return await aio.read(self.get_members)
+    
+    async def aget_passwords(self) -> List[Dict[str, Any]]:
+        """Récupère les mots de passe du groupe sans bloquer la boucle"""
+        return await aio.read(self.get_passwords)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convertit le groupe en dictionnaire"""
@@ -163,5 +326,6 @@ class Groupe(Model):
             'nom': self.nom,
             'admin_id': self.admin_id,
             'created_at': self.created_at,
-            'member_count': len(self.get_members())
+            'member_count': self.count_members(),
+            'password_count': self.count_passwords()
         }
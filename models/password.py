@@ -1,9 +1,15 @@
+import re
 import secrets
-import string
 import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from database import Model, db
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from database import Model, db, chunked
+from generator import DEFAULT_ALPHABET, PasswordPolicy, generate_many
+from passphrase import generate_passphrase
+from strength import estimate_strength
+from cache import invalidate, lookup
+from queries import registry
+import aio
 
 class Password(Model):
     def __init__(self, id: str, intitule: str, valeur_chiffree: str, created_by: str, created_at: str):
@@ -15,92 +21,214 @@ class Password(Model):
         self.created_at = created_at
     
     @staticmethod
-    def generate(length: int = 16) -> str:
-        """Génère un mot de passe aléatoire"""
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(alphabet) for _ in range(length))
+    def generate(length: int = 16, policy: Optional[PasswordPolicy] = None) -> str:
+        """Génère un mot de passe aléatoire, éventuellement conforme à une politique"""
+        if policy is not None:
+            return policy.generate(length)
+        return ''.join(secrets.choice(DEFAULT_ALPHABET) for _ in range(length))
+
+    @staticmethod
+    def generate_many(count: int, length: int = 16, alphabet: Optional[str] = None,
+                      policy: Optional[PasswordPolicy] = None) -> Iterator[str]:
+        """Génère un grand nombre de mots de passe en flux (voir generator.generate_many)"""
+        if policy is not None:
+            return policy.generate_many(count, length)
+        return generate_many(count, length, alphabet)
+
+    @staticmethod
+    def generate_passphrase(words: int = 6, wordlist: Optional[str] = None,
+                            separator: str = '-', capitalize: str = 'none') -> str:
+        """Génère une phrase de passe (voir passphrase.generate_passphrase)"""
+        return generate_passphrase(words, wordlist, separator, capitalize)
 
     @classmethod
-    def create(cls, intitule: str, valeur: str, created_by: str) -> 'Password':
-        """Crée un nouveau mot de passe"""
+    def create(cls, intitule: str, valeur: str, created_by: str, min_score: Optional[int] = None) -> 'Password':
+        """Crée un nouveau mot de passe (refusé si son score est inférieur à min_score)"""
+        if min_score is not None:
+            strength = estimate_strength(valeur)
+            if strength['score'] < min_score:
+                raise ValueError(f"Mot de passe trop faible ({strength['label']})")
+
         password_id = str(uuid.uuid4())
         created_at = datetime.now().isoformat()
 
-        # Création du mot de passe
-        super().query_insert(
-            'INSERT INTO password (id, intitule, valeur_chiffree, created_by, created_at) VALUES (?, ?, ?, ?, ?)',
-            (password_id, intitule, valeur, created_by, created_at)
-        )
+        with cls.transaction():
+            # Création du mot de passe
+            super().query_insert(registry['password.insert'], (password_id, intitule, valeur, created_by, created_at))
 
-        # Ajout du mot de passe à l'utilisateur qui l'a créé
-        super().query_insert(
-            'INSERT INTO user_pwd (user_id, password_id) VALUES (?, ?)',
-            (created_by, password_id)
-        )
+            # Ajout du mot de passe à l'utilisateur qui l'a créé
+            super().query_insert(registry['user_pwd.insert'], (created_by, password_id))
 
         return cls(password_id, intitule, valeur, created_by, created_at)
 
+    @classmethod
+    def bulk_create(cls, entries: Iterable[Tuple[str, str, str]], chunk_size: int = 1000) -> List['Password']:
+        """
+        Crée des mots de passe en masse à partir de tuples (intitule, valeur, created_by).
+        Tout l'import est fait dans une seule transaction.
+        """
+        passwords = []
+        with cls.transaction():
+            for chunk in chunked(entries, chunk_size):
+                created_at = datetime.now().isoformat()
+                batch = [cls(str(uuid.uuid4()), intitule, valeur, created_by, created_at)
+                         for intitule, valeur, created_by in chunk]
+                super().query_insert_many(
+                    registry['password.insert'],
+                    [(p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at) for p in batch]
+                )
+                super().query_insert_many(
+                    registry['user_pwd.insert'],
+                    [(p.created_by, p.id) for p in batch]
+                )
+                passwords.extend(batch)
+        return passwords
+
     def delete(self, deleted_by: str) -> bool:
         """Supprime le mot de passe"""
         # Vérifier que la personne qui supprime est le créateur
         if self.created_by != deleted_by:
             return False
 
-        # Supprimer les entrées de partage
-        super().query_delete('DELETE FROM user_pwd WHERE password_id = ?', (self.id,))
-        super().query_delete('DELETE FROM grp_pwd WHERE password_id = ?', (self.id,))
+        with self.transaction():
+            # Supprimer les entrées de partage
+            super().query_delete(registry['user_pwd.delete_password'], (self.id,))
+            super().query_delete(registry['grp_pwd.delete_password'], (self.id,))
 
-        # Supprimer le mot de passe
-        super().query_delete('DELETE FROM password WHERE id = ?', (self.id,))
+            # Supprimer le mot de passe
+            super().query_delete(registry['password.delete'], (self.id,))
+        invalidate(('password', self.id))
         return True
 
     def share_with_user(self, user_id: str, shared_by: str) -> bool:
         """Partage le mot de passe avec un autre utilisateur"""
-        # Vérifier que la personne qui partage a accès au mot de passe
-        has_access = super().query_one(
-            'SELECT 1 FROM user_pwd WHERE user_id = ? AND password_id = ?',
-            (shared_by, self.id)
-        )
-        if not has_access:
-            return False
-
-        # Vérifier si l'utilisateur a déjà accès
-        already_shared = super().query_one(
-            'SELECT 1 FROM user_pwd WHERE user_id = ? AND password_id = ?',
-            (user_id, self.id)
-        )
-        if already_shared:
+        shared = super().query_execute(registry['password.share'], (user_id, self.id, shared_by, self.id))
+        if shared:
+            invalidate(('password', self.id))
             return True
+        # Rien d'inséré : soit déjà partagé, soit le partageur n'a pas accès
+        return super().query_one(registry['user_pwd.exists'], (shared_by, self.id)) is not None
 
-        # Partager le mot de passe
-        super().query_insert(
-            'INSERT INTO user_pwd (user_id, password_id) VALUES (?, ?)',
-            (user_id, self.id)
-        )
-        return True
+    def share_with_users(self, user_ids: Iterable[str], shared_by: str) -> int:
+        """Partage le mot de passe avec plusieurs utilisateurs ; retourne le nombre de nouveaux partages"""
+        return self.share_many([self.id], user_ids, shared_by)
+
+    @classmethod
+    def share_many(cls, password_ids: Iterable[str], user_ids: Iterable[str], shared_by: str,
+                   chunk_size: int = 1000) -> int:
+        """
+        Partage chaque mot de passe avec chaque utilisateur, en une seule transaction.
+        Les mots de passe auxquels `shared_by` n'a pas accès sont ignorés.
+        Retourne le nombre de nouveaux partages.
+        """
+        password_ids = list(password_ids)
+        user_ids = list(user_ids)
+        pairs = ((user_id, password_id, shared_by, password_id)
+                 for password_id in password_ids for user_id in user_ids)
+        shared = 0
+        with cls.transaction():
+            for chunk in chunked(pairs, chunk_size):
+                shared += super().query_insert_many(registry['password.share'], chunk)
+        invalidate(*(('password', password_id) for password_id in password_ids))
+        return shared
 
     @classmethod
     def get_by_id(cls, password_id: str) -> Optional['Password']:
         """Récupère un mot de passe par son ID"""
-        row = super().query_one(
-            'SELECT id, intitule, valeur_chiffree, created_by, created_at FROM password WHERE id = ?',
-            (password_id,)
+        return lookup(
+            ('password', password_id),
+            lambda: cls.query_one(registry['password.by_id'], (password_id,)),
+            cls
         )
-        if row:
-            return cls(*row)
-        return None
+
+    @classmethod
+    def get_many(cls, user_id: str, password_ids: Iterable[str], chunk_size: int = 500) -> List['Password']:
+        """Récupère plusieurs mots de passe par ID, limités à ceux accessibles à l'utilisateur"""
+        passwords = []
+        for chunk in chunked(dict.fromkeys(password_ids), chunk_size):
+            query = cls.access_query('password.by_ids_for_user', placeholders=', '.join('?' * len(chunk)))
+            rows = super().query_many(query, (user_id, *chunk))
+            passwords.extend(cls(*row) for row in rows)
+        return passwords
 
     @classmethod
     def get_by_user(cls, user_id: str) -> List['Password']:
         """Récupère tous les mots de passe d'un utilisateur"""
-        rows = super().query_many('''
-            SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
-            FROM password p
-            JOIN user_pwd up ON p.id = up.password_id
-            WHERE up.user_id = ?
-        ''', (user_id,))
+        return list(cls.iter_by_user(user_id))
+
+    @classmethod
+    def iter_by_user(cls, user_id: str, batch_size: int = 500) -> Iterator['Password']:
+        """Parcourt en flux les mots de passe d'un utilisateur, par identifiant"""
+        query = registry.render('password.by_user', keyset='')
+        for row in super().query_iter(query, (user_id,), batch_size):
+            yield cls(*row)
+
+    @classmethod
+    def page_by_user(cls, user_id: str, page_size: int = 50,
+                     after: Optional[tuple] = None) -> Tuple[List['Password'], Optional[tuple]]:
+        """Retourne une page de mots de passe d'un utilisateur et le curseur de la suivante"""
+        rows, cursor = super().query_page(registry['password.by_user'], (user_id,), 'up.password_id',
+                                          page_size, after, lambda row: (row[0],))
+        return [cls(*row) for row in rows], cursor
+
+    @staticmethod
+    def _match_expression(text: str) -> Optional[str]:
+        """Transforme la saisie en requête FTS5 : chaque mot devient un préfixe obligatoire"""
+        terms = re.findall(r'\w+', text)
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    @classmethod
+    def search(cls, user_id: str, query: str, limit: int = 20) -> List['Password']:
+        """Recherche par intitulé parmi les mots de passe accessibles, les plus pertinents d'abord"""
+        expression = cls._match_expression(query)
+        if expression is None:
+            return []
+        rows = super().query_many(cls.access_query('password.search'), (user_id, expression, limit))
         return [cls(*row) for row in rows]
 
+    def strength(self) -> Dict[str, Any]:
+        """Évalue la robustesse du mot de passe"""
+        return estimate_strength(self.valeur_chiffree)
+
+    # Variantes asynchrones, exécutées hors de la boucle par aio.executor
+
+    @classmethod
+    async def acreate(cls, intitule: str, valeur: str, created_by: str,
+                      min_score: Optional[int] = None) -> 'Password':
+        """Crée un mot de passe (écriture via l'écrivain unique)"""
+        return await aio.write(cls.create, intitule, valeur, created_by, min_score)
+
+    async def adelete(self, deleted_by: str) -> bool:
+        """Supprime le mot de passe (écriture via l'écrivain unique)"""
+        return await aio.write(self.delete, deleted_by)
+
+    async def ashare_with_user(self, user_id: str, shared_by: str) -> bool:
+        """Partage le mot de passe avec un utilisateur (écriture via l'écrivain unique)"""
+        return await aio.write(self.share_with_user, user_id, shared_by)
+
+    @classmethod
+    async def aget_by_id(cls, password_id: str) -> Optional['Password']:
+        """Récupère un mot de passe par son ID sans bloquer la boucle"""
+        return await aio.read(cls.get_by_id, password_id)
+
+    @classmethod
+    async def aget_by_user(cls, user_id: str) -> List['Password']:
+        """Récupère les mots de passe d'un utilisateur sans bloquer la boucle"""
+        return await aio.read(cls.get_by_user, user_id)
+
+    @classmethod
+    async def apage_by_user(cls, user_id: str, page_size: int = 50,
+                            after: Optional[tuple] = None) -> Tuple[List['Password'], Optional[tuple]]:
+        """Retourne une page de mots de passe d'un utilisateur sans bloquer la boucle"""
+        return await aio.read(cls.page_by_user, user_id, page_size, after)
+
+    @classmethod
+    async def asearch(cls, user_id: str, query: str, limit: int = 20) -> List['Password']:
+        """Recherche par intitulé sans bloquer la boucle"""
+        return await aio.read(cls.search, user_id, query, limit)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convertit le mot de passe en dictionnaire"""
         return {
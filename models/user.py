@@ -1,8 +1,16 @@
-import hashlib
+import asyncio
+import sqlite3
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from database import Model
+from typing import Optional, List, Dict, Any, Generator, Iterable, Iterator, Tuple
+from database import Model, chunked
+from strength import estimator
+from hashing import (dummy_hash, hash_password, hash_password_async, hash_passwords, needs_rehash,
+                     verify_password, verify_password_async)
+from auth import login_guard
+from cache import invalidate, lookup
+from queries import registry
+import aio
 
 class User(Model):
     def __init__(self, id: str, nom: str, prenom: str, mail: str, mdp_hash: str, created_at: Optional[str] = None):
@@ -17,6 +25,13 @@ class User(Model):
     @classmethod
     def create(cls, nom: str, prenom: str, mail: str, mdp: str) -> 'User':
         """Crée un nouvel utilisateur"""
+        # Email vérifié avant le hachage : un email invalide ou déjà pris ne coûte pas de hachage
+        cls._check_new_email(mail)
+        return cls.create_hashed(nom, prenom, mail, hash_password(mdp))
+    
+    @classmethod
+    def _check_new_email(cls, mail: str) -> None:
+        """Vérifie le format et l'unicité d'un email avant la création d'un compte"""
         # Vérification de la validité de l'email
         if not cls._is_valid_email(mail):
             raise ValueError("Format d'email invalide")
@@ -24,19 +39,54 @@ class User(Model):
         # Vérification de l'unicité de l'email
         if cls.get_by_email(mail) is not None:
             raise ValueError("Cet email est déjà utilisé")
-            
+    
+    @classmethod
+    def create_hashed(cls, nom: str, prenom: str, mail: str, mdp_hash: str) -> 'User':
+        """
+        Crée un nouvel utilisateur à partir de l'empreinte déjà calculée de son
+        mot de passe (l'email est vérifié au préalable par _check_new_email)
+        """
         user_id = str(uuid.uuid4())
-        mdp_hash = hashlib.sha256(mdp.encode()).hexdigest()
         created_at = datetime.now().isoformat()
         
-        # Utilisation de query_insert de la classe Model via super()
-        super().query_insert(
-            'INSERT INTO app_user (id, nom, prenom, mail, mdp_hash, created_at) VALUES (?, ?, ?, ?, ?, ?)',
-            (user_id, nom, prenom, mail, mdp_hash, created_at)
-        )
+        # Utilisation de query_insert de la classe Model via super() ;
+        # la contrainte d'unicité tranche si l'email a été pris entre-temps
+        try:
+            super().query_insert(
+                registry['user.insert'],
+                (user_id, nom, prenom, mail, mdp_hash, created_at)
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError("Cet email est déjà utilisé")
         
         return cls(user_id, nom, prenom, mail, mdp_hash, created_at)
     
+    @classmethod
+    def bulk_create(cls, entries: Iterable[Tuple[str, str, str, str]], chunk_size: int = 1000) -> List['User']:
+        """
+        Crée des utilisateurs en masse à partir de tuples (nom, prenom, mail, mdp).
+        Si un email est invalide ou déjà utilisé, aucun utilisateur n'est créé.
+        """
+        entries = list(entries)
+        for _, _, mail, _ in entries:
+            if not cls._is_valid_email(mail):
+                raise ValueError(f"Format d'email invalide : {mail}")
+        # Hachage (coûteux) avant la transaction : le verrou d'écriture n'est pris que pour les insertions
+        created_at = datetime.now().isoformat()
+        hashes = hash_passwords(mdp for _, _, _, mdp in entries)
+        users = [cls(str(uuid.uuid4()), nom, prenom, mail, mdp_hash, created_at)
+                 for (nom, prenom, mail, _), mdp_hash in zip(entries, hashes)]
+        with cls.transaction():
+            for batch in chunked(users, chunk_size):
+                try:
+                    super().query_insert_many(
+                        registry['user.insert'],
+                        [(u.id, u.nom, u.prenom, u.mail, u.mdp_hash, u.created_at) for u in batch]
+                    )
+                except sqlite3.IntegrityError:
+                    raise ValueError("Un des emails est déjà utilisé")
+        return users
+    
     @staticmethod
     def _is_valid_email(email: str) -> bool:
         """Vérifie si l'email est valide"""
@@ -44,52 +94,163 @@ class User(Model):
         pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         return re.match(pattern, email) is not None
     
+    @classmethod
+    def _login_steps(cls, mail: str, mdp: str) -> Generator[tuple, Any, Optional['User']]:
+        """
+        Logique de connexion commune à get_by_credentials et aget_by_credentials.
+        Chaque opération coûteuse est cédée à l'appelant sous la forme
+        ('lookup', mail), ('verify', mdp, empreinte), ('hash', mdp) ou ('save', user),
+        qui l'exécute et renvoie son résultat.
+        """
+        # Compte verrouillé après trop d'échecs : rejet sans requête ni hachage
+        if login_guard.is_locked(mail):
+            return None
+        user = yield ('lookup', mail)
+        if user is None:
+            # Même coût qu'un compte existant : pas d'énumération des emails par le temps de réponse
+            yield ('verify', mdp, dummy_hash())
+            login_guard.record_failure(mail)
+            return None
+        # Une empreinte à migrer contourne le cache des connexions récentes
+        if needs_rehash(user.mdp_hash) or not login_guard.is_verified(mail, mdp, user.mdp_hash):
+            if not (yield ('verify', mdp, user.mdp_hash)):
+                login_guard.record_failure(mail)
+                return None
+            # Empreinte ancienne ou paramètres de coût modifiés : on la recalcule
+            if needs_rehash(user.mdp_hash):
+                user.mdp_hash = yield ('hash', mdp)
+                yield ('save', user)
+            login_guard.remember(mail, mdp, user.mdp_hash)
+        login_guard.record_success(mail)
+        return user
+    
     @classmethod
     def get_by_credentials(cls, mail: str, mdp: str) -> Optional['User']:
         """Récupère un utilisateur par ses identifiants"""
-        mdp_hash = hashlib.sha256(mdp.encode()).hexdigest()
-        row = super().query_one(
-            'SELECT id, nom, prenom, mail, mdp_hash, created_at FROM app_user WHERE mail = ? AND mdp_hash = ?',
-            (mail, mdp_hash)
-        )
-        if row:
-            return cls(*row)
-        return None
+        steps = cls._login_steps(mail, mdp)
+        try:
+            step = next(steps)
+            while True:
+                kind, *args = step
+                if kind == 'lookup':
+                    result = cls.get_by_email(*args)
+                elif kind == 'verify':
+                    result = verify_password(*args)
+                elif kind == 'hash':
+                    result = hash_password(*args)
+                else:
+                    result = args[0]._save_hash()
+                step = steps.send(result)
+        except StopIteration as done:
+            return done.value
+    
+    def _save_hash(self) -> None:
+        """Enregistre l'empreinte recalculée du mot de passe"""
+        super().query_update(registry['user.update_hash'], (self.mdp_hash, self.id))
+        invalidate(('user', self.id), ('user_mail', self.mail))
     
     @classmethod
     def get_by_id(cls, user_id: str) -> Optional['User']:
         """Récupère un utilisateur par son ID"""
-        row = super().query_one(
-            'SELECT id, nom, prenom, mail, mdp_hash, created_at FROM app_user WHERE id = ?',
-            (user_id,)
+        return lookup(
+            ('user', user_id),
+            lambda: cls.query_one(registry['user.by_id'], (user_id,)),
+            cls
         )
-        if row:
-            return cls(*row)
-        return None
     
     @classmethod
     def get_by_email(cls, email: str) -> Optional['User']:
         """Récupère un utilisateur par son email"""
-        row = super().query_one(
-            'SELECT id, nom, prenom, mail, mdp_hash, created_at FROM app_user WHERE mail = ?',
-            (email,)
+        return lookup(
+            ('user_mail', email),
+            lambda: cls.query_one(registry['user.by_mail'], (email,)),
+            cls,
+            identity=lambda row: ('user', row[0])
         )
-        if row:
-            return cls(*row)
-        return None
     
-    def get_passwords(self) -> List[Dict[str, Any]]:
-        """Récupère tous les mots de passe de l'utilisateur"""
-        rows = super().query_many(
-            'SELECT id, intitule, valeur_chiffree, created_at FROM password WHERE created_by = ?',
-            (self.id,)
-        )
-        return [{
+    @staticmethod
+    def _password_dict(row: tuple) -> Dict[str, Any]:
+        return {
             'id': row[0],
             'intitule': row[1],
             'valeur': row[2],
             'created_at': row[3]
-        } for row in rows]
+        }
+    
+    def get_passwords(self) -> List[Dict[str, Any]]:
+        """Récupère tous les mots de passe de l'utilisateur"""
+        return list(self.iter_passwords())
+    
+    def iter_passwords(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Parcourt en flux les mots de passe de l'utilisateur, par date de création"""
+        query = registry.render('user.passwords', keyset='')
+        for row in super().query_iter(query, (self.id,), batch_size):
+            yield self._password_dict(row)
+    
+    def page_passwords(self, page_size: int = 50,
+                       after: Optional[tuple] = None) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """Retourne une page de mots de passe et le curseur de la suivante"""
+        rows, cursor = super().query_page(registry['user.passwords'], (self.id,), 'created_at, id',
+                                          page_size, after, lambda row: (row[3], row[0]))
+        return [self._password_dict(row) for row in rows], cursor
+    
+    def audit_passwords(self) -> List[Dict[str, Any]]:
+        """Évalue en une passe la robustesse de tous les mots de passe de l'utilisateur"""
+        passwords = self.get_passwords()
+        scores = estimator.estimate_many(p['valeur'] for p in passwords)
+        return [{'id': p['id'], 'intitule': p['intitule'], **score} for p, score in zip(passwords, scores)]
+    
+    # Variantes asynchrones, exécutées hors de la boucle par aio.executor
+    
+    @classmethod
+    async def acreate(cls, nom: str, prenom: str, mail: str, mdp: str) -> 'User':
+        """Crée un nouvel utilisateur (hachage dans son pool, écriture via l'écrivain unique)"""
+        # Hachage dans son pool avant la soumission : l'écrivain ne garde pas
+        # sa transaction ouverte pendant le calcul de l'empreinte
+        await aio.read(cls._check_new_email, mail)
+        mdp_hash = await asyncio.wrap_future(hash_password_async(mdp))
+        return await aio.write(cls.create_hashed, nom, prenom, mail, mdp_hash)
+    
+    @classmethod
+    async def aget_by_credentials(cls, mail: str, mdp: str) -> Optional['User']:
+        """Récupère un utilisateur par ses identifiants (voir _login_steps)"""
+        # Seule la recherche par email occupe un lecteur : le hachage est attendu
+        # dans son propre pool sans bloquer de thread de la base
+        steps = cls._login_steps(mail, mdp)
+        try:
+            step = next(steps)
+            while True:
+                kind, *args = step
+                if kind == 'lookup':
+                    result = await aio.read(cls.get_by_email, *args)
+                elif kind == 'verify':
+                    result = await asyncio.wrap_future(verify_password_async(*args))
+                elif kind == 'hash':
+                    result = await asyncio.wrap_future(hash_password_async(*args))
+                else:
+                    result = await aio.write(args[0]._save_hash)
+                step = steps.send(result)
+        except StopIteration as done:
+            return done.value
+    
+    @classmethod
+    async def aget_by_id(cls, user_id: str) -> Optional['User']:
+        """Récupère un utilisateur par son ID sans bloquer la boucle"""
+        return await aio.read(cls.get_by_id, user_id)
+    
+    @classmethod
+    async def aget_by_email(cls, email: str) -> Optional['User']:
+        """Récupère un utilisateur par son email sans bloquer la boucle"""
+        return await aio.read(cls.get_by_email, email)
+    
+    async def aget_passwords(self) -> List[Dict[str, Any]]:
+        """Récupère les mots de passe de l'utilisateur sans bloquer la boucle"""
+        return await aio.read(self.get_passwords)
+    
+    async def apage_passwords(self, page_size: int = 50,
+                              after: Optional[tuple] = None) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """Retourne une page de mots de passe de l'utilisateur sans bloquer la boucle"""
+        return await aio.read(self.page_passwords, page_size, after)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convertit l'utilisateur en dictionnaire"""
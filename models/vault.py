@@ -0,0 +1,58 @@
+from typing import List, Dict, Any, Iterator
+from database import Model
+import aio
+
+class Vault(Model):
+    """
+    Coffre effectif d'un utilisateur : tous les mots de passe auxquels il a accès.
+    Les droits sont résolus par jointures sur user_pwd, grp_pwd et membre, ou lus
+    dans la table effective_access si elle est activée (voir Database.materialize_access).
+    """
+    
+    @classmethod
+    def for_user(cls, user_id: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt en flux le coffre d'un utilisateur, résolu en une seule requête.
+        Chaque entrée n'apparaît qu'une fois, avec la liste de ses chemins d'accès
+        ('partage', 'createur', 'groupe') et les groupes concernés.
+        """
+        for row in super().query_iter(cls.access_query('vault.for_user'), (user_id,), batch_size):
+            yield {
+                'id': row[0],
+                'intitule': row[1],
+                'valeur': row[2],
+                'created_by': row[3],
+                'created_at': row[4],
+                'via': row[5].split(','),
+                'groupes': row[6].split(',') if row[6] else []
+            }
+    
+    @classmethod
+    def list_for_user(cls, user_id: str) -> List[Dict[str, Any]]:
+        """Retourne le coffre complet d'un utilisateur sous forme de liste"""
+        return list(cls.for_user(user_id))
+    
+    @classmethod
+    def can_read(cls, user_id: str, password_id: str) -> bool:
+        """Indique si l'utilisateur a accès au mot de passe (lectures par clé primaire)"""
+        return super().query_one(cls.access_query('vault.can_read'), (user_id, password_id)) is not None
+    
+    @classmethod
+    async def alist_for_user(cls, user_id: str) -> List[Dict[str, Any]]:
+        """Retourne le coffre complet d'un utilisateur sans bloquer la boucle"""
+        return await aio.read(cls.list_for_user, user_id)
+    
+    @classmethod
+    async def acan_read(cls, user_id: str, password_id: str) -> bool:
+        """Indique si l'utilisateur a accès au mot de passe, sans bloquer la boucle"""
+        return await aio.read(cls.can_read, user_id, password_id)
+    
+    @classmethod
+    def rebuild_access(cls) -> int:
+        """Reconstruit entièrement effective_access (voir Database.rebuild_effective_access)"""
+        return cls._get_db().rebuild_effective_access()
+    
+    @classmethod
+    def verify_access(cls) -> Dict[str, int]:
+        """Compare effective_access aux tables de liaison (voir Database.verify_effective_access)"""
+        return cls._get_db().verify_effective_access()
@@ -0,0 +1,147 @@
+import math
+import mmap
+import os
+import secrets
+import struct
+import threading
+from array import array
+from typing import Dict, Optional, Union
+
+# Liste de mots utilisée par défaut si aucune n'est fournie
+DEFAULT_WORDLIST = os.environ.get('PASSPHRASE_WORDLIST', '/usr/share/dict/words')
+
+# En-tête du fichier d'index : magie, type des offsets, taille et date de la liste source, nombre de mots
+_INDEX_MAGIC = b'PWIX'
+_INDEX_HEADER = struct.Struct('<4s1sxxQQQ')
+
+
+class Wordlist:
+    """
+    Liste de mots projetée en mémoire (mmap) avec un index d'offsets.
+    L'index est construit une fois, enregistré à côté de la liste
+    (`<liste>.idx`) puis lui aussi projeté en mémoire : seules les pages
+    réellement lues sont chargées.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._words: Optional[mmap.mmap] = None
+        self._offsets = None
+
+    def _load(self) -> None:
+        """Ouvre la liste et son index au premier accès"""
+        with self._lock:
+            if self._offsets is not None:
+                return
+            with open(self.path, 'rb') as f:
+                self._words = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = self._load_index() or self._build_index()
+
+    def _source_stat(self):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self):
+        """Projette l'index existant s'il correspond encore à la liste"""
+        try:
+            with open(self.path + '.idx', 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(index) < _INDEX_HEADER.size:
+            return None
+        magic, typecode, size, mtime, count = _INDEX_HEADER.unpack_from(index)
+        if magic != _INDEX_MAGIC or (size, mtime) != self._source_stat():
+            return None
+        offsets = memoryview(index)[_INDEX_HEADER.size:].cast(typecode.decode())
+        return offsets if len(offsets) == count else None
+
+    def _build_index(self):
+        """Parcourt la liste une fois pour relever le début de chaque mot"""
+        words = self._words
+        size = len(words)
+        offsets = array('I' if size < 2 ** 32 else 'Q')
+        start = 0
+        while start < size:
+            end = words.find(b'\n', start)
+            if end == -1:
+                end = size
+            if words[start:end].strip():
+                offsets.append(start)
+            start = end + 1
+        try:
+            with open(self.path + '.idx', 'wb') as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, offsets.typecode.encode(),
+                                           *self._source_stat(), len(offsets)))
+                offsets.tofile(f)
+        except OSError:
+            # Répertoire en lecture seule : l'index reste en mémoire
+            pass
+        return offsets
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> str:
+        self._load()
+        start = self._offsets[i]
+        end = self._words.find(b'\n', start)
+        line = self._words[start:end if end != -1 else len(self._words)]
+        # Format diceware « 11111<tab>mot » : on garde le dernier champ
+        return line.split()[-1].decode('utf-8')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._words is not None:
+                self._offsets = None
+                self._words.close()
+                self._words = None
+
+
+_wordlists: Dict[str, Wordlist] = {}
+_wordlists_lock = threading.Lock()
+
+def get_wordlist(path: Optional[str] = None) -> Wordlist:
+    """Retourne la liste de mots partagée pour ce chemin (chargée à la première utilisation)"""
+    path = os.path.abspath(path or DEFAULT_WORDLIST)
+    with _wordlists_lock:
+        wordlist = _wordlists.get(path)
+        if wordlist is None:
+            wordlist = _wordlists[path] = Wordlist(path)
+    return wordlist
+
+
+def passphrase_entropy(words: int, wordlist_size: int, capitalize: str = 'none') -> float:
+    """Entropie en bits d'une phrase de passe tirée uniformément"""
+    bits = words * math.log2(wordlist_size)
+    if capitalize == 'random':
+        bits += words
+    return bits
+
+
+def generate_passphrase(words: int = 6, wordlist: Union[str, Wordlist, None] = None,
+                        separator: str = '-', capitalize: str = 'none') -> str:
+    """
+    Génère une phrase de passe de `words` mots.
+    capitalize : 'none', 'first' (premier mot), 'all' (chaque mot) ou 'random'.
+    """
+    if words < 1:
+        raise ValueError("Une phrase de passe contient au moins un mot")
+    if capitalize not in ('none', 'first', 'all', 'random'):
+        raise ValueError(f"Mode de capitalisation inconnu : {capitalize}")
+    if not isinstance(wordlist, Wordlist):
+        wordlist = get_wordlist(wordlist)
+    size = len(wordlist)
+    if size < 2:
+        raise ValueError("La liste de mots est trop courte")
+
+    chosen = [wordlist[secrets.randbelow(size)] for _ in range(words)]
+    if capitalize == 'all':
+        chosen = [w.capitalize() for w in chosen]
+    elif capitalize == 'first':
+        chosen[0] = chosen[0].capitalize()
+    elif capitalize == 'random':
+        chosen = [w.capitalize() if secrets.randbits(1) else w for w in chosen]
+    return separator.join(chosen)
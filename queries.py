@@ -0,0 +1,321 @@
+import textwrap
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class QueryRegistry:
+    """
+    Registre central des requêtes SQL des modèles, chacune sous un nom
+    ('user.by_id', 'password.search'...). Le texte enregistré est toujours le
+    même objet : il sert de clé au cache de requêtes préparées de sqlite3
+    (cached_statements) et permet de mesurer le temps passé par requête.
+    Les gabarits ({keyset}, {placeholders}) sont rendus par render().
+    """
+
+    def __init__(self):
+        self.timing = True
+        self._statements: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._rendered: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], str] = {}
+        self._stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str) -> str:
+        """Enregistre une requête sous un nom unique et retourne son texte"""
+        if name in self._statements:
+            raise ValueError(f"Requête déjà enregistrée : {name}")
+        sql = textwrap.dedent(sql).strip()
+        self._statements[name] = sql
+        self._names[sql] = name
+        return sql
+
+    def __getitem__(self, name: str) -> str:
+        return self._statements[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._statements
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._statements)
+
+    def items(self):
+        return self._statements.items()
+
+    def render(self, name: str, **fields: Any) -> str:
+        """Rend un gabarit ; le texte obtenu est mémorisé et rattaché au nom du gabarit"""
+        key = (name, tuple(sorted(fields.items())))
+        sql = self._rendered.get(key)
+        if sql is None:
+            sql = self._statements[name].format(**fields)
+            with self._lock:
+                sql = self._rendered.setdefault(key, sql)
+                self._names.setdefault(sql, name)
+        return sql
+
+    def name_of(self, sql: str) -> str:
+        """Nom d'une requête enregistrée (ou début du texte pour une requête ad hoc)"""
+        name = self._names.get(sql)
+        if name is None:
+            name = ' '.join(sql.split())[:80]
+        return name
+
+    @contextmanager
+    def timed(self, sql: str, name: Optional[str] = None) -> Iterator[None]:
+        """Mesure la durée du bloc et l'ajoute aux statistiques de la requête"""
+        if not self.timing:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            name = name or self.name_of(sql)
+            with self._lock:
+                entry = self._stats.get(name)
+                if entry is None:
+                    self._stats[name] = [1, elapsed, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+                    if elapsed > entry[2]:
+                        entry[2] = elapsed
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Statistiques par requête (nombre d'appels, temps total, moyen et maximal en ms), par temps total décroissant"""
+        with self._lock:
+            entries = [(name, *values) for name, values in self._stats.items()]
+        return [{
+            'query': name,
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'mean_ms': round(total * 1000 / calls, 3),
+            'max_ms': round(longest * 1000, 3),
+        } for name, calls, total, longest in sorted(entries, key=lambda e: e[2], reverse=True)]
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+registry = QueryRegistry()
+register = registry.register
+
+# Droit de lecture de l'utilisateur ?1 sur p, résolu par les tables de liaison :
+# création, partage direct (user_pwd) ou groupe (membre + grp_pwd), chacun par index
+ACCESS_PREDICATE = '''(
+        p.created_by = ?1
+        OR EXISTS (SELECT 1 FROM user_pwd up WHERE up.user_id = ?1 AND up.password_id = p.id)
+        OR EXISTS (SELECT 1 FROM grp_pwd gp JOIN membre m ON m.groupe_id = gp.groupe_id
+                   WHERE gp.password_id = p.id AND m.user_id = ?1)
+      )'''
+
+# --- Utilisateurs ------------------------------------------------------------
+
+register('user.insert', '''
+    INSERT INTO app_user (id, nom, prenom, mail, mdp_hash, created_at) VALUES (?, ?, ?, ?, ?, ?)
+''')
+register('user.by_id', '''
+    SELECT id, nom, prenom, mail, mdp_hash, created_at FROM app_user WHERE id = ?
+''')
+register('user.by_mail', '''
+    SELECT id, nom, prenom, mail, mdp_hash, created_at FROM app_user WHERE mail = ?
+''')
+register('user.update_hash', '''
+    UPDATE app_user SET mdp_hash = ? WHERE id = ?
+''')
+# Gabarit paginé par clé (created_at, id) : {keyset} est rendu par Database.query_page
+register('user.passwords', '''
+    SELECT id, intitule, valeur_chiffree, created_at
+    FROM password
+    WHERE created_by = ? {keyset}
+    ORDER BY created_at, id
+''')
+
+# --- Groupes -----------------------------------------------------------------
+
+register('groupe.insert', '''
+    INSERT INTO groupe (id, nom, admin_id, created_at) VALUES (?, ?, ?, ?)
+''')
+register('groupe.by_id', '''
+    SELECT id, nom, admin_id, created_at FROM groupe WHERE id = ?
+''')
+register('groupe.by_user', '''
+    SELECT g.id, g.nom, g.admin_id, g.created_at
+    FROM groupe g
+    JOIN membre m ON g.id = m.groupe_id
+    WHERE m.user_id = ?
+''')
+register('groupe.by_user_with_stats', '''
+    SELECT g.id, g.nom, g.admin_id, g.created_at,
+           (SELECT COUNT(*) FROM membre mc WHERE mc.groupe_id = g.id) AS member_count,
+           (SELECT COUNT(*) FROM grp_pwd gp WHERE gp.groupe_id = g.id) AS password_count
+    FROM groupe g
+    JOIN membre m ON g.id = m.groupe_id
+    WHERE m.user_id = ?
+    ORDER BY g.nom
+''')
+register('groupe.count_members', '''
+    SELECT COUNT(*) FROM membre WHERE groupe_id = ?
+''')
+register('groupe.count_passwords', '''
+    SELECT COUNT(*) FROM grp_pwd WHERE groupe_id = ?
+''')
+register('groupe.members', '''
+    SELECT u.id, u.nom, u.prenom, u.mail,
+           CASE WHEN u.id = ? THEN 1 ELSE 0 END as is_admin, u.created_at
+    FROM app_user u
+    JOIN membre m ON u.id = m.user_id
+    WHERE m.groupe_id = ? {keyset}
+    ORDER BY u.created_at, u.id
+''')
+register('groupe.passwords', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_at, u.nom, u.prenom
+    FROM password p
+    JOIN grp_pwd gp ON p.id = gp.password_id
+    JOIN app_user u ON p.created_by = u.id
+    WHERE gp.groupe_id = ? {keyset}
+    ORDER BY p.created_at, p.id
+''')
+register('grp_pwd.insert', '''
+    INSERT INTO grp_pwd (groupe_id, password_id) VALUES (?, ?)
+''')
+
+# --- Membres -----------------------------------------------------------------
+
+register('membre.insert', '''
+    INSERT INTO membre (user_id, groupe_id) VALUES (?, ?)
+''')
+register('membre.insert_ignore', '''
+    INSERT INTO membre (user_id, groupe_id) VALUES (?, ?) ON CONFLICT DO NOTHING
+''')
+register('membre.insert_by_id', '''
+    INSERT INTO membre (user_id, groupe_id) SELECT id, ? FROM app_user WHERE id = ? ON CONFLICT DO NOTHING
+''')
+register('membre.exists', '''
+    SELECT 1 FROM membre WHERE user_id = ? AND groupe_id = ?
+''')
+register('membre.delete', '''
+    DELETE FROM membre WHERE user_id = ? AND groupe_id = ?
+''')
+# Résolution des emails et détection des membres existants en une requête
+register('membre.resolve_mails', '''
+    SELECT u.mail, u.id, m.user_id IS NOT NULL
+    FROM app_user u
+    LEFT JOIN membre m ON m.user_id = u.id AND m.groupe_id = ?
+    WHERE u.mail IN ({placeholders})
+''')
+
+# --- Mots de passe -----------------------------------------------------------
+
+register('password.insert', '''
+    INSERT INTO password (id, intitule, valeur_chiffree, created_by, created_at) VALUES (?, ?, ?, ?, ?)
+''')
+register('password.by_id', '''
+    SELECT id, intitule, valeur_chiffree, created_by, created_at FROM password WHERE id = ?
+''')
+# Requêtes de droits : variante par jointures (par défaut) et variante
+# '.materialized' sur effective_access (voir Database.materialize_access).
+# Paramètres numérotés : ?1 est l'utilisateur, les {placeholders} suivent.
+register('password.by_ids_for_user', f'''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
+    FROM password p
+    WHERE {ACCESS_PREDICATE}
+      AND p.id IN ({{placeholders}})
+''')
+register('password.by_ids_for_user.materialized', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
+    FROM password p
+    WHERE EXISTS (SELECT 1 FROM effective_access ea WHERE ea.user_id = ?1 AND ea.password_id = p.id)
+      AND p.id IN ({placeholders})
+''')
+# Parcours dans l'ordre de la clé primaire (user_id, password_id) de user_pwd :
+# ni tri temporaire ni relecture de tout l'ensemble à chaque page
+register('password.by_user', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
+    FROM user_pwd up
+    JOIN password p ON p.id = up.password_id
+    WHERE up.user_id = ? {keyset}
+    ORDER BY up.password_id
+''')
+register('password.search', f'''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
+    FROM password_fts f
+    JOIN password p ON p.rowid = f.rowid
+    WHERE password_fts MATCH ?2
+      AND {ACCESS_PREDICATE}
+    ORDER BY f.rank
+    LIMIT ?3
+''')
+register('password.search.materialized', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at
+    FROM password_fts f
+    JOIN password p ON p.rowid = f.rowid
+    WHERE password_fts MATCH ?2
+      AND EXISTS (SELECT 1 FROM effective_access ea WHERE ea.user_id = ?1 AND ea.password_id = p.id)
+    ORDER BY f.rank
+    LIMIT ?3
+''')
+register('password.delete', '''
+    DELETE FROM password WHERE id = ?
+''')
+register('user_pwd.insert', '''
+    INSERT INTO user_pwd (user_id, password_id) VALUES (?, ?)
+''')
+register('user_pwd.exists', '''
+    SELECT 1 FROM user_pwd WHERE user_id = ? AND password_id = ?
+''')
+register('user_pwd.delete_password', '''
+    DELETE FROM user_pwd WHERE password_id = ?
+''')
+register('grp_pwd.delete_password', '''
+    DELETE FROM grp_pwd WHERE password_id = ?
+''')
+# Partage en une seule instruction : n'insère que si le partageur a lui-même accès
+register('password.share', '''
+    INSERT INTO user_pwd (user_id, password_id)
+    SELECT ?, ?
+    WHERE EXISTS (SELECT 1 FROM user_pwd WHERE user_id = ? AND password_id = ?)
+    ON CONFLICT DO NOTHING
+''')
+
+# --- Coffre ------------------------------------------------------------------
+
+# Chemins d'accès : partage direct (user_pwd), création, groupe (membre + grp_pwd)
+register('vault.for_user', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at,
+           group_concat(DISTINCT a.via) AS via,
+           group_concat(DISTINCT a.groupe_id) AS groupes
+    FROM (
+        SELECT up.password_id, 'partage' AS via, NULL AS groupe_id
+        FROM user_pwd up WHERE up.user_id = ?1
+        UNION ALL
+        SELECT pc.id, 'createur', NULL
+        FROM password pc WHERE pc.created_by = ?1
+        UNION ALL
+        SELECT gp.password_id, 'groupe', gp.groupe_id
+        FROM membre m JOIN grp_pwd gp ON gp.groupe_id = m.groupe_id
+        WHERE m.user_id = ?1
+    ) a
+    JOIN password p ON p.id = a.password_id
+    GROUP BY p.id
+    ORDER BY p.intitule
+''')
+register('vault.for_user.materialized', '''
+    SELECT p.id, p.intitule, p.valeur_chiffree, p.created_by, p.created_at,
+           group_concat(DISTINCT ea.via) AS via,
+           group_concat(DISTINCT NULLIF(ea.groupe_id, '')) AS groupes
+    FROM effective_access ea
+    JOIN password p ON p.id = ea.password_id
+    WHERE ea.user_id = ?1
+    GROUP BY p.id
+    ORDER BY p.intitule
+''')
+register('vault.can_read', f'''
+    SELECT 1 FROM password p WHERE p.id = ?2 AND {ACCESS_PREDICATE}
+''')
+register('vault.can_read.materialized', '''
+    SELECT 1 FROM effective_access WHERE user_id = ?1 AND password_id = ?2 LIMIT 1
+''')
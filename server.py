@@ -0,0 +1,404 @@
+import argparse
+import base64
+import json
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from generator import PasswordPolicy
+from models import User, Groupe, Password, Vault
+
+# Taille maximale d'un lot (génération, partage, lecture multiple)
+MAX_BATCH = 10_000
+MAX_WORDS = 64
+# Nombre maximal de partages (mots de passe × utilisateurs) écrits en une transaction
+MAX_SHARES = 100_000
+MAX_BODY = 16 * 1024 * 1024
+
+# Champs acceptés pour une politique de génération et leur type
+POLICY_FIELDS = {
+    'lower': int, 'upper': int, 'digits': int, 'symbols': int, 'max_repeat': int,
+    'symbol_set': str, 'exclude_ambiguous': bool,
+}
+
+
+class ApiError(Exception):
+    """Erreur renvoyée au client avec un code HTTP"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class SessionStore:
+    """Jetons de session en mémoire, expirés après `ttl` secondes d'inactivité"""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def open(self, user_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (user_id, time.monotonic() + self.ttl)
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            if entry[1] < now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (entry[0], now + self.ttl)
+            return entry[0]
+
+    def close(self, token: str) -> None:
+        with self._lock:
+            self._sessions.pop(token, None)
+
+
+sessions = SessionStore()
+
+
+def _encode_cursor(cursor: Optional[tuple]) -> Optional[str]:
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+def _decode_cursor(value: Optional[str], size: int = 2) -> Optional[tuple]:
+    """Décode un curseur de pagination : `size` chaînes, sinon 400"""
+    if not value:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(value.encode()))
+    except (ValueError, TypeError):
+        raise ApiError(400, "Curseur invalide")
+    if not isinstance(cursor, list) or len(cursor) != size or not all(isinstance(v, str) for v in cursor):
+        raise ApiError(400, "Curseur invalide")
+    return tuple(cursor)
+
+def _field(body: Dict[str, Any], name: str, kind: type = str) -> Any:
+    value = body.get(name)
+    if not isinstance(value, kind):
+        raise ApiError(400, f"Champ '{name}' manquant ou invalide")
+    return value
+
+def _batch(body: Dict[str, Any], name: str, kind: type = str) -> List[Any]:
+    values = _field(body, name, list)
+    if len(values) > MAX_BATCH:
+        raise ApiError(413, f"Au plus {MAX_BATCH} éléments par lot")
+    if not all(isinstance(value, kind) for value in values):
+        raise ApiError(400, f"Éléments de '{name}' invalides")
+    return values
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int, maximum: int) -> int:
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(400, f"Paramètre '{name}' invalide")
+    return max(1, min(value, maximum))
+
+def _optional_int(body: Dict[str, Any], name: str) -> Optional[int]:
+    value = body.get(name)
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ApiError(400, f"Champ '{name}' invalide")
+    return value
+
+def _bounded_int(body: Dict[str, Any], name: str, default: int, minimum: int, maximum: int) -> int:
+    value = body.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or not minimum <= value <= maximum:
+        raise ApiError(400, f"'{name}' doit être compris entre {minimum} et {maximum}")
+    return value
+
+def _policy(body: Dict[str, Any]) -> Optional[PasswordPolicy]:
+    """Construit et compile la politique de génération du corps, sinon 400"""
+    options = body.get('policy')
+    if options is None:
+        return None
+    if not isinstance(options, dict):
+        raise ApiError(400, "Champ 'policy' invalide")
+    for name, value in options.items():
+        kind = POLICY_FIELDS.get(name)
+        if kind is None:
+            raise ApiError(400, f"Politique invalide : option inconnue '{name}'")
+        if kind is int:
+            valid = value is None or (isinstance(value, int) and not isinstance(value, bool))
+        else:
+            valid = isinstance(value, kind) and not (kind is str and len(value) > 256)
+        if not valid:
+            raise ApiError(400, f"Politique invalide : '{name}'")
+    try:
+        policy = PasswordPolicy(**options)
+        policy.compile()
+    except ValueError as e:
+        raise ApiError(400, f"Politique invalide : {e}")
+    return policy
+
+def _member_group(user_id: str, groupe_id: str) -> Groupe:
+    """Retourne le groupe si l'utilisateur en est membre, sinon 404"""
+    groupe = Groupe.get_by_id(groupe_id)
+    if groupe is None or not groupe.is_member(user_id):
+        raise ApiError(404, "Groupe introuvable")
+    return groupe
+
+
+# --- Points d'entrée ---------------------------------------------------------
+# Chaque fonction reçoit (user_id, correspondance de l'URL, paramètres, corps JSON)
+
+def create_user(user_id, match, params, body):
+    try:
+        user = User.create(_field(body, 'nom'), _field(body, 'prenom'), _field(body, 'mail'), _field(body, 'mdp'))
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return 201, user.to_dict()
+
+def login(user_id, match, params, body):
+    user = User.get_by_credentials(_field(body, 'mail'), _field(body, 'mdp'))
+    if user is None:
+        raise ApiError(401, "Email ou mot de passe incorrect")
+    return 200, {'token': sessions.open(user.id), 'user': user.to_dict()}
+
+def me(user_id, match, params, body):
+    return 200, User.get_by_id(user_id).to_dict()
+
+def list_passwords(user_id, match, params, body):
+    user = User.get_by_id(user_id)
+    items, cursor = user.page_passwords(_int_param(params, 'limit', 50, 1000),
+                                        _decode_cursor(params.get('after', [None])[0]))
+    return 200, {'items': items, 'next': _encode_cursor(cursor)}
+
+def search_passwords(user_id, match, params, body):
+    query = params.get('q', [''])[0]
+    results = Password.search(user_id, query, _int_param(params, 'limit', 20, 200))
+    return 200, {'items': [p.to_dict() for p in results]}
+
+def create_passwords(user_id, match, params, body):
+    """Un mot de passe ({intitule, valeur}) ou un lot ({items: [...]})"""
+    if 'items' not in body:
+        try:
+            password = Password.create(_field(body, 'intitule'), _field(body, 'valeur'), user_id,
+                                       _optional_int(body, 'min_score'))
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return 201, password.to_dict()
+    items = _batch(body, 'items', dict)
+    entries = [(_field(item, 'intitule'), _field(item, 'valeur'), user_id) for item in items]
+    return 201, {'items': [p.to_dict() for p in Password.bulk_create(entries)]}
+
+def get_passwords(user_id, match, params, body):
+    """Lecture multiple : les IDs inaccessibles sont simplement absents de la réponse"""
+    passwords = Password.get_many(user_id, _batch(body, 'ids'))
+    return 200, {'items': [p.to_dict() for p in passwords]}
+
+def delete_password(user_id, match, params, body):
+    password = Password.get_by_id(match.group(1))
+    if password is None or not password.delete(user_id):
+        raise ApiError(404, "Mot de passe introuvable")
+    return 200, {'deleted': True}
+
+def share_passwords(user_id, match, params, body):
+    password_ids, user_ids = _batch(body, 'password_ids'), _batch(body, 'user_ids')
+    if len(password_ids) * len(user_ids) > MAX_SHARES:
+        raise ApiError(413, f"Au plus {MAX_SHARES} partages par requête")
+    shared = Password.share_many(password_ids, user_ids, user_id)
+    return 200, {'shared': shared}
+
+def generate(user_id, match, params, body):
+    count = _bounded_int(body, 'count', 1, 1, MAX_BATCH)
+    length = _bounded_int(body, 'length', 16, 4, 1024)
+    if body.get('passphrase'):
+        words = _bounded_int(body, 'words', 6, 1, MAX_WORDS)
+        separator = body.get('separator', '-')
+        if not isinstance(separator, str) or len(separator) > 8:
+            raise ApiError(400, "'separator' doit être une chaîne d'au plus 8 caractères")
+        try:
+            values = [Password.generate_passphrase(words, separator=separator) for _ in range(count)]
+        except ValueError as e:
+            raise ApiError(400, f"Phrase de passe impossible : {e}")
+        except OSError:
+            # Liste de mots absente ou illisible : le chemin reste côté serveur
+            raise ApiError(503, "Liste de mots indisponible")
+        return 200, {'items': values}
+    policy = _policy(body)
+    try:
+        values = list(Password.generate_many(count, length, policy=policy))
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return 200, {'items': values}
+
+def vault(user_id, match, params, body):
+    return 200, {'items': Vault.list_for_user(user_id)}
+
+def list_groups(user_id, match, params, body):
+    return 200, {'items': [g.to_dict() for g in Groupe.list_for_user_with_stats(user_id)]}
+
+def create_group(user_id, match, params, body):
+    return 201, Groupe.create(_field(body, 'nom'), user_id).to_dict()
+
+def group_members(user_id, match, params, body):
+    groupe = _member_group(user_id, match.group(1))
+    return 200, {'items': groupe.get_members()}
+
+def add_group_members(user_id, match, params, body):
+    groupe = _member_group(user_id, match.group(1))
+    if not groupe.is_admin(user_id):
+        raise ApiError(403, "Seul l'administrateur peut ajouter des membres")
+    return 200, {'results': groupe.add_members_by_email(_batch(body, 'emails'), user_id)}
+
+def group_passwords(user_id, match, params, body):
+    groupe = _member_group(user_id, match.group(1))
+    items, cursor = groupe.page_passwords(_int_param(params, 'limit', 50, 1000),
+                                          _decode_cursor(params.get('after', [None])[0]))
+    return 200, {'items': items, 'next': _encode_cursor(cursor)}
+
+
+# (méthode, motif, fonction, authentification requise)
+ROUTES: List[Tuple[str, 're.Pattern', Callable, bool]] = [
+    (method, re.compile(f'^{pattern}$'), handler, auth)
+    for method, pattern, handler, auth in (
+        ('POST', '/users', create_user, False),
+        ('POST', '/login', login, False),
+        ('GET', '/me', me, True),
+        ('GET', '/passwords', list_passwords, True),
+        ('POST', '/passwords', create_passwords, True),
+        ('GET', '/passwords/search', search_passwords, True),
+        ('POST', '/passwords/get', get_passwords, True),
+        ('POST', '/passwords/share', share_passwords, True),
+        ('DELETE', '/passwords/([^/]+)', delete_password, True),
+        ('POST', '/generate', generate, True),
+        ('GET', '/vault', vault, True),
+        ('GET', '/groups', list_groups, True),
+        ('POST', '/groups', create_group, True),
+        ('GET', '/groups/([^/]+)/members', group_members, True),
+        ('POST', '/groups/([^/]+)/members', add_group_members, True),
+        ('GET', '/groups/([^/]+)/passwords', group_passwords, True),
+    )
+]
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Gestionnaire JSON ; HTTP/1.1 pour garder les connexions ouvertes entre requêtes"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PasswordManager/1.0'
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, l'ACK retardé
+    # du client bloque chaque réponse d'une connexion gardée ouverte (~40 ms)
+    disable_nagle_algorithm = True
+
+    def _send(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self, method: str) -> Dict[str, Any]:
+        """
+        Lit le corps JSON annoncé par Content-Length. Si le corps n'est pas lu
+        en entier, la connexion est fermée : ses octets restants ne doivent pas
+        être pris pour la requête suivante.
+        """
+        header = self.headers.get('Content-Length')
+        if header is None and method != 'POST' and 'Transfer-Encoding' not in self.headers:
+            return {}
+        if header is None or not re.fullmatch(r'[0-9]+', header.strip()):
+            self.close_connection = True
+            raise ApiError(400, "En-tête Content-Length manquant ou invalide")
+        length = int(header)
+        if length > MAX_BODY:
+            self.close_connection = True
+            raise ApiError(413, "Corps de requête trop volumineux")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "JSON invalide")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Le corps doit être un objet JSON")
+        return body
+
+    def _authenticate(self) -> str:
+        header = self.headers.get('Authorization', '')
+        user_id = sessions.resolve(header[7:]) if header.startswith('Bearer ') else None
+        if user_id is None:
+            raise ApiError(401, "Authentification requise")
+        return user_id
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        try:
+            # Le corps est toujours lu pour laisser la connexion réutilisable
+            body = self._read_body(method)
+            allowed = False
+            for route_method, pattern, handler, auth in ROUTES:
+                match = pattern.match(url.path)
+                if match is None:
+                    continue
+                allowed = True
+                if route_method != method:
+                    continue
+                user_id = self._authenticate() if auth else None
+                status, payload = handler(user_id, match, parse_qs(url.query), body)
+                self._send(status, payload)
+                return
+            raise ApiError(405 if allowed else 404, "Méthode non autorisée" if allowed else "Ressource introuvable")
+        except ApiError as e:
+            self._send(e.status, {'error': e.message})
+        except Exception as e:
+            self.log_error("Erreur interne : %r", e)
+            self._send(500, {'error': "Erreur interne"})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host: str = '127.0.0.1', port: int = 8080, quiet: bool = False) -> ThreadingHTTPServer:
+    """Crée le serveur (un thread par connexion, chaque connexion gardée ouverte)"""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.quiet = quiet
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON local du gestionnaire de mots de passe")
+    parser.add_argument('--host', default='127.0.0.1', help="adresse d'écoute (défaut : boucle locale)")
+    parser.add_argument('--port', type=int, default=8080, help="port d'écoute")
+    parser.add_argument('--quiet', action='store_true', help="désactive le journal des requêtes")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.quiet)
+    print(f"Service disponible sur http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
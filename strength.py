@@ -0,0 +1,180 @@
+import hashlib
+import math
+import os
+import string
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+# Mots de passe et mots très fréquents (complétables via StrengthEstimator(dictionary=...))
+COMMON_WORDS = frozenset({
+    'password', 'passw0rd', 'motdepasse', 'azerty', 'qwerty', 'admin', 'administrateur',
+    'welcome', 'bienvenue', 'letmein', 'monkey', 'dragon', 'master', 'soleil', 'iloveyou',
+    'jetaime', 'football', 'baseball', 'princess', 'sunshine', 'shadow', 'superman',
+    'batman', 'trustno1', 'secret', 'login', 'abc123', 'starwars', 'chocolat', 'doudou',
+    'marseille', 'paris', 'france', 'google', 'facebook', 'orange', 'loulou', 'nicolas',
+    'julien', 'camille', 'pokemon', 'changeme', 'default', 'root', 'toor', 'test', 'guest',
+})
+
+KEYBOARD_ROWS = ('qwertyuiop', 'asdfghjkl', 'zxcvbnm', 'azertyuiop', 'qsdfghjklm', 'wxcvbn', '1234567890')
+
+# Substitutions « leet » ramenées à la lettre d'origine avant la recherche dans le dictionnaire
+LEET_TABLE = str.maketrans('0134@$57!', 'oleaassti')
+
+SCORE_THRESHOLDS = (28, 36, 60, 80)
+SCORE_LABELS = ('très faible', 'faible', 'moyen', 'fort', 'très fort')
+
+
+_CHARSET_CLASSES = (
+    (frozenset(string.ascii_lowercase), 26),
+    (frozenset(string.ascii_uppercase), 26),
+    (frozenset(string.digits), 10),
+    (frozenset(string.punctuation + ' '), 33),
+)
+
+def _charset_size(value: str) -> int:
+    """Taille de l'alphabet déduite des classes de caractères présentes"""
+    chars = set(value)
+    size = sum(class_size for members, class_size in _CHARSET_CLASSES if not members.isdisjoint(chars))
+    if not value.isascii():
+        size += 100
+    return size or 1
+
+
+def _pattern_pairs() -> frozenset:
+    """Paires de caractères consécutifs qui prolongent une suite ou une répétition"""
+    pairs = set()
+    chars = string.ascii_lowercase + string.digits + string.punctuation
+    for c in chars:
+        pairs.add(c + c)
+    for sequence in (string.ascii_lowercase, string.digits) + KEYBOARD_ROWS:
+        for a, b in zip(sequence, sequence[1:]):
+            pairs.add(a + b)
+            pairs.add(b + a)
+    return frozenset(pairs)
+
+PATTERN_PAIRS = _pattern_pairs()
+
+
+def _pattern_runs(value: str) -> List[tuple]:
+    """Repère les suites (abc, 321, qwerty) et répétitions (aaa) d'au moins 3 caractères"""
+    lowered = value.lower()
+    runs = []
+    start = 0
+    for i in range(1, len(lowered) + 1):
+        if i < len(lowered) and lowered[i - 1:i + 1] in PATTERN_PAIRS:
+            continue
+        if i - start >= 3:
+            runs.append((start, i - start))
+        start = i
+    return runs
+
+
+class StrengthEstimator:
+    """
+    Estime la robustesse d'un mot de passe en bits d'entropie, en pénalisant
+    les suites, répétitions et mots du dictionnaire. Les résultats sont mis
+    en cache par empreinte BLAKE2 à clé (jamais en clair), avec éviction LRU.
+    """
+
+    def __init__(self, dictionary: Optional[Iterable[str]] = None, cache_size: int = 100_000):
+        self.dictionary = COMMON_WORDS | frozenset(w.lower() for w in (dictionary or ()))
+        self.min_word = min(len(w) for w in self.dictionary)
+        # Longueurs présentes (de la plus longue à la plus courte) et préfixes, pour élaguer la recherche
+        self.lengths = sorted({len(w) for w in self.dictionary}, reverse=True)
+        self.prefixes = frozenset(w[:self.min_word] for w in self.dictionary)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[bytes, Dict[str, Any]]' = OrderedDict()
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+
+    def _digest(self, value: str) -> bytes:
+        return hashlib.blake2b(value.encode(), key=self._key, digest_size=16).digest()
+
+    def _dictionary_words(self, value: str) -> List[tuple]:
+        """Retourne les mots du dictionnaire trouvés (position, longueur), le plus long d'abord"""
+        normalized = value.lower().translate(LEET_TABLE)
+        found = []
+        n = len(normalized)
+        i = 0
+        while i <= n - self.min_word:
+            match = 0
+            if normalized[i:i + self.min_word] in self.prefixes:
+                for length in self.lengths:
+                    if i + length <= n and normalized[i:i + length] in self.dictionary:
+                        match = length
+                        break
+            if match:
+                found.append((i, match))
+                i += match
+            else:
+                i += 1
+        return found
+
+    def _analyse(self, value: str) -> Dict[str, Any]:
+        if not value:
+            return {'entropy': 0.0, 'score': 0, 'label': SCORE_LABELS[0], 'warnings': ['mot de passe vide']}
+        bits_per_char = math.log2(_charset_size(value))
+        covered = [False] * len(value)
+        bits = 0.0
+        warnings = []
+
+        # Un mot du dictionnaire ne vaut que son rang dans le dictionnaire
+        words = self._dictionary_words(value)
+        if words:
+            warnings.append('contient un mot courant')
+        for start, length in words:
+            bits += math.log2(len(self.dictionary)) + 1
+            covered[start:start + length] = [True] * length
+
+        # Une suite ou répétition vaut son premier caractère et sa longueur
+        for start, length in _pattern_runs(value):
+            if any(covered[start:start + length]):
+                continue
+            warnings.append('contient une suite ou une répétition')
+            bits += bits_per_char + math.log2(length)
+            covered[start:start + length] = [True] * length
+
+        bits += covered.count(False) * bits_per_char
+
+        # Motif répété en entier (abcabc, 1212...)
+        for size in range(1, len(value) // 2 + 1):
+            if len(value) % size == 0 and value[:size] * (len(value) // size) == value:
+                bits = min(bits, size * bits_per_char + math.log2(len(value) // size))
+                warnings.append('motif répété')
+                break
+
+        score = sum(bits >= threshold for threshold in SCORE_THRESHOLDS)
+        return {
+            'entropy': round(bits, 1),
+            'score': score,
+            'label': SCORE_LABELS[score],
+            'warnings': sorted(set(warnings)),
+        }
+
+    def estimate(self, value: str) -> Dict[str, Any]:
+        """Retourne entropie, score (0 à 4), libellé et avertissements"""
+        digest = self._digest(value)
+        with self._lock:
+            result = self._cache.get(digest)
+            if result is not None:
+                self._cache.move_to_end(digest)
+                return result
+        result = self._analyse(value)
+        with self._lock:
+            self._cache[digest] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def estimate_many(self, values: Iterable[str]) -> List[Dict[str, Any]]:
+        """Évalue un lot de valeurs en une passe (les doublons ne sont analysés qu'une fois)"""
+        return [self.estimate(value) for value in values]
+
+
+# Estimateur partagé par les modèles
+estimator = StrengthEstimator()
+
+def estimate_strength(value: str) -> Dict[str, Any]:
+    """Évalue la robustesse d'un mot de passe avec l'estimateur partagé"""
+    return estimator.estimate(value)
@@ -126,15 +126,15 @@ def test_view_groups(user):
     print_header("MES GROUPES")
     print("Récupération de vos groupes...")
     
-    groupes = Groupe.get_by_user(user.id)
+    groupes = Groupe.list_for_user_with_stats(user.id)
     if not groupes:
         print("\nVous n'êtes dans aucun groupe.")
         return []
     
     print(f"\n👥 Vous êtes dans {len(groupes)} groupe(s) :")
     for i, groupe in enumerate(groupes, 1):
-        admin_status = " (Admin)" if groupe.admin_id == user.id else ""
-        print(f"{i}. {groupe.nom}{admin_status} - {len(groupe.get_members())} membre(s)")
+        admin_status = " (Admin)" if groupe.is_admin(user.id) else ""
+        print(f"{i}. {groupe.nom}{admin_status} - {groupe.member_count} membre(s), {groupe.password_count} mot(s) de passe")
     
     return groupes
 